@@ -0,0 +1,37 @@
+"""Compare `process_image` on opaque and transparent images."""
+
+from common import best_of, photo_image, report
+from PIL import Image
+from swatcher import image
+
+
+def allocated(source: object) -> int:
+    """Count the PIL images allocated while processing `source`."""
+    before = Image.core.get_stats()["new_count"]
+    image.process_image(source)
+    return Image.core.get_stats()["new_count"] - before
+
+
+def main():
+    rows = []
+    opaque = photo_image(3000)
+    rgba = opaque.convert("RGBA")
+    transparent = rgba.copy()
+    transparent.putpixel((1500, 1500), (0, 0, 0, 0))
+    for name, source in (("RGB", opaque), ("RGBA opaque", rgba), ("RGBA", transparent)):
+        rows.append(
+            (
+                name,
+                allocated(source),
+                f"{best_of(lambda: image.process_image(source)):.1f}",
+            )
+        )
+    report(
+        f"process_image on a 3000px image ({3000 * 3000 * 4 / 2 ** 20:.0f}MB per RGBA buffer)",
+        ("source", "images allocated", "ms"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
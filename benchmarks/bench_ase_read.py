@@ -0,0 +1,57 @@
+"""Measure Adobe ASE parsing throughput in MB/s."""
+
+import os
+import random
+import tempfile
+
+from common import best_of, report
+from swatcher import export
+
+
+def main():
+    random.seed(0)
+    rows = []
+    with tempfile.TemporaryDirectory() as temp:
+        for n in (1000, 10000, 50000):
+            palettes = (
+                (
+                    f"image-{i}.jpg",
+                    [tuple(random.randrange(256) for _ in range(3)) for _ in range(8)],
+                )
+                for i in range(n)
+            )
+            fp = export.export_ase_groups(palettes, os.path.join(temp, str(n)))
+            with open(fp, "rb") as file:
+                data = file.read()
+            megabytes = len(data) / 1024 / 1024
+
+            def in_memory():
+                for _ in export.iter_ase(data):
+                    pass
+
+            def mapped():
+                for _ in export.read_ase(fp):
+                    pass
+
+            def rgb_palettes():
+                export.read_ase_palettes(fp)
+
+            rows.append(
+                (
+                    n,
+                    f"{megabytes:.1f}",
+                    f"{megabytes / best_of(in_memory) * 1000:.1f}",
+                    f"{megabytes / best_of(mapped) * 1000:.1f}",
+                    f"{megabytes / best_of(rgb_palettes) * 1000:.1f}",
+                )
+            )
+
+    report(
+        "Parse grouped ASE files of 8 color palettes (MB/s)",
+        ("palettes", "MB", "bytes", "mmap file", "rgb palettes"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Time greedy sampling against the clustering palette extractors."""
+
+from common import best_of, photo_image, report
+from swatcher import cluster, color, palette
+
+
+def main():
+    rows = []
+    for size in (250, 1000):
+        histogram = color.get_histogram(photo_image(size))
+        rows.append(
+            (
+                size,
+                len(histogram),
+                f"{best_of(lambda: palette.sample(histogram, 8, 75)):.1f}",
+                f"{best_of(lambda: cluster.kmeans(histogram, 8)):.1f}",
+                f"{best_of(lambda: cluster.median_cut(histogram, 8)):.1f}",
+            )
+        )
+    report(
+        "8 color palette from a photo (ms)",
+        ("size", "colors", "greedy", "kmeans", "median-cut"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
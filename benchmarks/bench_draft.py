@@ -0,0 +1,41 @@
+"""Compare the exact and draft decode paths of `process_image` on a large JPEG."""
+
+from io import BytesIO
+
+from common import best_of, photo_image, report
+from PIL import Image
+from swatcher import image
+
+
+def main():
+    source = BytesIO()
+    photo_image(2000).resize((7200, 5400)).save(source, "JPEG")
+    rows = []
+    for draft in (False, True):
+
+        def run():
+            source.seek(0)
+            return image.process_image(Image.open(source), draft=draft)
+
+        source.seek(0)
+        decoded = Image.open(source)
+        if draft:
+            decoded = image.draft_image(decoded)
+        w, h = decoded.size
+        rows.append(
+            (
+                "draft" if draft else "exact",
+                f"{w}x{h}",
+                f"{w * h * 4 / 2 ** 20:.1f}",
+                f"{best_of(run):.1f}",
+            )
+        )
+    report(
+        "process_image on a 7200x5400 (39MP) JPEG",
+        ("path", "decoded", "RGBA buffer MB", "ms"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Time drawing palette images with cold and warm font and label caches."""
+
+import random
+
+from common import best_of, report
+from swatcher import palette
+
+
+def main():
+    random.seed(0)
+    rows = []
+    for n in (8, 64):
+        colors = [tuple(random.randrange(256) for _ in range(3)) for _ in range(n)]
+
+        def cold():
+            palette.set_font.cache_clear()
+            palette._label_mask.cache_clear()
+            palette.draw_swatches(colors)
+
+        def warm():
+            palette.draw_swatches(colors)
+
+        rows.append((n, f"{best_of(cold, 5):.2f}", f"{best_of(warm, 5):.2f}"))
+
+    report("Draw palette images (ms)", ("colors", "cold caches", "warm caches"), rows)
+
+
+if __name__ == "__main__":
+    main()
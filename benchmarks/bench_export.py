@@ -0,0 +1,64 @@
+"""Time encoding Adobe ASE files with swatch dictionaries against the direct encoder."""
+
+import os
+import random
+import tempfile
+
+from io import BytesIO
+from common import best_of, report
+from swatcher import export
+
+
+def main():
+    random.seed(0)
+    rows = []
+    with tempfile.TemporaryDirectory() as temp:
+        path = os.path.join(temp, "colors")
+        for n in (8, 256, 10000):
+            colors = [tuple(random.randrange(256) for _ in range(3)) for _ in range(n)]
+
+            def dicts():
+                return export.colors_to_bytes(export.create_ase_swatches(colors))
+
+            def temp_file():
+                # the previous `export_ase_file` round trip
+                with open(path, "wb") as file:
+                    file.write(export.write_ase_file(colors).read())
+
+            def stream():
+                export.write_ase(colors, BytesIO())
+
+            def cold_stream():
+                export.clear_caches()
+                export.write_ase(colors, BytesIO())
+
+            def to_file():
+                export.export_ase_file(colors, path)
+
+            rows.append(
+                (
+                    n,
+                    f"{best_of(dicts, 5):.3f}",
+                    f"{best_of(cold_stream, 5):.3f}",
+                    f"{best_of(stream, 5):.3f}",
+                    f"{best_of(temp_file, 5):.3f}",
+                    f"{best_of(to_file, 5):.3f}",
+                )
+            )
+
+    report(
+        "Encode Adobe ASE swatches (ms)",
+        (
+            "colors",
+            "dicts",
+            "direct (cold)",
+            "direct (cached)",
+            "temp file export",
+            "direct export",
+        ),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
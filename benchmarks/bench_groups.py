@@ -0,0 +1,57 @@
+"""
+Time exporting one ASE file per palette against one grouped ASE file.
+
+The peak memory of the grouped export is measured with the hex and
+encoded color block caches disabled. With them enabled the peak also
+includes the caches filling up, bounded by `color.COLOR_CACHE_SIZE` and
+`export.SWATCH_CACHE_SIZE` entries.
+"""
+
+import os
+import random
+import tempfile
+import tracemalloc
+
+from common import best_of, report
+from swatcher import color, export
+
+
+def main():
+    random.seed(0)
+    rows = []
+    for n in (100, 1000, 10000):
+        palettes = [
+            (f"image-{i}.jpg", [tuple(random.randrange(256) for _ in range(3))] * 8)
+            for i in range(n)
+        ]
+        with tempfile.TemporaryDirectory() as temp:
+
+            def separate():
+                for name, colors in palettes:
+                    export.export_ase_file(colors, os.path.join(temp, name))
+
+            def grouped():
+                export.export_ase_groups(iter(palettes), os.path.join(temp, "all"))
+
+            times = (best_of(separate, 3), best_of(grouped, 3))
+            # measured after the timing runs so one-off allocations (eg.
+            # imports and compiled structs) don't count towards the peak
+            color.set_cache_size(0)
+            export.set_cache_size(0)
+            tracemalloc.start()
+            grouped()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            color.set_cache_size(color.COLOR_CACHE_SIZE)
+            export.set_cache_size(export.SWATCH_CACHE_SIZE)
+            rows.append((n, *(f"{t:.1f}" for t in times), f"{peak / 1024:.1f}"))
+
+    report(
+        "Export 8 color palettes (ms)",
+        ("palettes", "file each", "grouped", "grouped peak KiB (no cache)"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
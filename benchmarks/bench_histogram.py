@@ -0,0 +1,46 @@
+"""Compare the color histogram engines and the memory of a `ColorHistogram`."""
+
+import sys
+
+from common import best_of, photo_image, report
+from swatcher import color
+
+
+def list_nbytes(colors: list, counts: list) -> int:
+    """Memory used by a list of color tuples and a list of counts."""
+    return (
+        sys.getsizeof(colors)
+        + sum(sys.getsizeof(c) for c in colors)
+        + sys.getsizeof(counts)
+        + sum(sys.getsizeof(c) for c in counts)
+    )
+
+
+def main():
+    rows = []
+    for size in (500, 1000, 4000):
+        image = photo_image(size)
+        histogram = color.get_histogram(image, "numpy")
+        python = best_of(lambda: color.get_histogram(image, "python"), repeat=2)
+        numpy = best_of(lambda: color.get_histogram(image, "numpy"), repeat=2)
+        colors, counts = histogram.tolist(), histogram.counts.tolist()
+        rows.append(
+            (
+                f"{size}px",
+                len(histogram),
+                f"{python:.1f}",
+                f"{numpy:.1f}",
+                f"{python / numpy:.1f}x",
+                f"{list_nbytes(colors, counts) / 2 ** 20:.1f}",
+                f"{histogram.nbytes / 2 ** 20:.1f}",
+            )
+        )
+    report(
+        "get_histogram (ms, best of 2) and memory (MB)",
+        ("size", "colors", "python", "numpy", "speedup", "list MB", "packed MB"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Measure `palette.SensitivityIndex` build cost against repeated sampling."""
+
+from common import best_of, photo_image, report
+from swatcher import color, palette
+
+
+def main():
+    rows = []
+    for size in (250, 500):
+        colors = color.get_colors(photo_image(size))
+        index = palette.SensitivityIndex(colors)
+        sample = best_of(lambda: palette.sample(colors, 8, 125))
+        lookup = best_of(lambda: index.lookup(8, 125), number=1000)
+        rows.append(
+            (
+                f"{size}px",
+                len(colors),
+                f"{index.build_time * 1000:.1f}",
+                f"{index.nbytes / 1024:.1f}",
+                f"{sample:.3f}",
+                f"{lookup:.4f}",
+            )
+        )
+    report(
+        "SensitivityIndex (ms)",
+        ("size", "colors", "build", "KiB", "sample", "lookup"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Time `Swatcher` construction against the first palette access."""
+
+from io import BytesIO
+
+from common import best_of, photo_image, report
+from swatcher import Swatcher
+
+
+def main():
+    source = BytesIO()
+    photo_image(2000).save(source, "JPEG")
+
+    def construct():
+        source.seek(0)
+        return Swatcher(source)
+
+    def sample():
+        return construct().palette
+
+    report(
+        "Swatcher on a 2000px JPEG (ms)",
+        ("construct", "construct + palette"),
+        [(f"{best_of(construct):.2f}", f"{best_of(sample):.1f}")],
+    )
+
+
+if __name__ == "__main__":
+    main()
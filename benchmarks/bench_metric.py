@@ -0,0 +1,55 @@
+"""Time `palette.sample` with each color distance metric."""
+
+import os
+
+from io import BytesIO
+
+from common import best_of, photo_image, report
+from PIL import Image, ImageDraw
+from swatcher import color, image, palette
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# comparable sensitivities, RGB distance and ΔE color difference
+SENSITIVITIES = {"rgb": 75, "cie76": 25, "ciede2000": 15}
+
+
+def stripes_image() -> object:
+    """The red, white and blue JPEG used by the Swatcher tests."""
+    img = Image.new("RGB", (600, 400), (255, 255, 255))
+    d = ImageDraw.Draw(img)
+    d.rectangle((0, 0, 200, 400), (255, 0, 0))
+    d.rectangle((400, 0, 600, 400), (0, 0, 255))
+    temp = BytesIO()
+    img.save(temp, "JPEG", quality=100, subsampling=0)
+    return Image.open(temp)
+
+
+def main():
+    fixtures = {
+        "stripes": stripes_image(),
+        "logo": Image.open(
+            os.path.join(ROOT, "examples", "flask_app", "static", "swatcher_logo.png")
+        ),
+        "photo": photo_image(500),
+    }
+    rows = []
+    for name, img in fixtures.items():
+        histogram = color.get_histogram(image.process_image(img))
+        row = [name, len(histogram)]
+        for metric, sensitivity in SENSITIVITIES.items():
+            ms = best_of(
+                lambda: palette.sample(histogram, 8, sensitivity, metric=metric),
+                number=5,
+            )
+            row.append(f"{ms:.2f}")
+        rows.append(tuple(row))
+    report(
+        "palette.sample(max_colors=8) per metric (ms)",
+        ("image", "colors") + tuple(f"{m} ({s})" for m, s in SENSITIVITIES.items()),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
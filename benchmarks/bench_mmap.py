@@ -0,0 +1,47 @@
+"""Time re-opening a saved histogram by copying it against memory-mapping it."""
+
+import os
+import tempfile
+
+from common import best_of, photo_image, report
+from swatcher import color, palette
+from swatcher.histogram import ColorHistogram, open_histogram
+
+
+def main():
+    rows = []
+    with tempfile.TemporaryDirectory() as temp:
+        for size in (500, 1000):
+            histogram = color.get_histogram(photo_image(size))
+            fp = os.path.join(temp, f"{size}.swch")
+            histogram.save(fp)
+
+            def read_copy():
+                with open(fp, "rb") as file:
+                    return ColorHistogram.from_bytes(file.read())
+
+            def open_mapped():
+                return open_histogram(fp)
+
+            def sample_mapped():
+                return palette.sample(open_histogram(fp), 8, 75)
+
+            rows.append(
+                (
+                    size,
+                    len(histogram),
+                    f"{best_of(read_copy, 5):.2f}",
+                    f"{best_of(open_mapped, 5):.3f}",
+                    f"{best_of(sample_mapped, 5):.2f}",
+                )
+            )
+
+    report(
+        "Re-open a saved histogram (ms)",
+        ("size", "colors", "copy", "mmap", "mmap + sample"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Compare counting raw pixels against counting normalized pixels."""
+
+from common import best_of, photo_image, report
+from PIL import ImageOps
+from swatcher import color, palette
+
+
+def main():
+    rows = []
+    # clip the shadows and highlights like a high contrast photo
+    source = ImageOps.autocontrast(photo_image(1000), cutoff=10)
+    for normalize in (False, True):
+        histogram = color.get_histogram(source, normalize=normalize)
+        rows.append(
+            (
+                "normalized" if normalize else "raw",
+                len(histogram),
+                f"{best_of(lambda: color.get_histogram(source, normalize=normalize)):.1f}",
+                f"{best_of(lambda: palette.sample(histogram, 20, 250), number=5):.2f}",
+            )
+        )
+    report(
+        "Histogram of a 1000px high contrast photo",
+        ("pixels", "colors", "count ms", "sample ms"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
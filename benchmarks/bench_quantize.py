@@ -0,0 +1,34 @@
+"""Compare memory and latency of the `process_image` quantize options."""
+
+import tracemalloc
+
+from common import best_of, photo_image, report
+from swatcher import color, image, palette
+
+
+def pipeline(source: object, quantize) -> list:
+    processed = image.process_image(source, quantize=quantize)
+    colors, counts = color.get_color_counts(processed)
+    return palette.sample(colors, 8, 75)
+
+
+def main():
+    rows = []
+    source = photo_image(2000)
+    for quantize in (None, 6, 5, 4, 3, "median-cut", "octree"):
+        processed = image.process_image(source, quantize=quantize)
+        tracemalloc.start()
+        colors, counts = color.get_color_counts(processed)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        ms = best_of(lambda: pipeline(source, quantize))
+        rows.append((str(quantize), len(colors), f"{peak / 1024:.0f}", f"{ms:.1f}"))
+    report(
+        "process_image + get_color_counts + sample on a 2000px photo",
+        ("quantize", "colors", "peak KiB", "ms"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
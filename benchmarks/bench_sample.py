@@ -0,0 +1,45 @@
+"""Time `palette.sample` on photographs where the palette may never fill."""
+
+from common import best_of, photo_image, report
+from swatcher import color, palette
+
+
+def main():
+    colors, counts = color.get_color_counts(photo_image(500))
+    rows = []
+    for max_colors, sensitivity in ((8, 75), (20, 20), (20, 150), (20, 250), (200, 10)):
+        sampled = palette.sample(colors, max_colors, sensitivity)
+        ms = best_of(lambda: palette.sample(colors, max_colors, sensitivity))
+        rows.append((max_colors, sensitivity, len(sampled), f"{ms:.2f}"))
+    report(
+        f"palette.sample on {len(colors)} colors (ms)",
+        ("max_colors", "sensitivity", "sampled", "time"),
+        rows,
+    )
+
+    rows = []
+    for max_candidates, coverage in ((None, None), (10000, None), (None, 0.5)):
+        result = palette.sample_report(
+            colors, 20, 250, max_candidates, coverage, counts
+        )
+        ms = best_of(
+            lambda: palette.sample(colors, 20, 250, max_candidates, coverage, counts)
+        )
+        rows.append(
+            (
+                max_candidates,
+                coverage,
+                result.considered,
+                f"{result.pixels:.2f}",
+                f"{ms:.2f}",
+            )
+        )
+    report(
+        "bounded palette.sample(max_colors=20, sensitivity=250) (ms)",
+        ("max_candidates", "coverage", "considered", "pixels", "time"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Load test resampling an uploaded image the way the Flask example does,
+with the colors kept as JSON in the session against a histogram store
+that the session only keeps the upload id for.
+"""
+
+import json
+import statistics
+import tempfile
+import timeit
+
+from common import photo_image, report
+from swatcher import color, palette
+from swatcher.store import FileStore, MemoryStore
+
+REQUESTS = 50
+
+
+def latency(resample) -> tuple:
+    """Median and 95th percentile resample latency in milliseconds."""
+    times = sorted(t * 1000 for t in timeit.repeat(resample, repeat=REQUESTS, number=1))
+    return statistics.median(times), times[int(len(times) * 0.95) - 1]
+
+
+def main():
+    rows = []
+    with tempfile.TemporaryDirectory() as temp:
+        for size in (250, 500):
+            histogram = color.get_histogram(photo_image(size))
+            session = {"colors": json.dumps(histogram.tolist())}
+            stores = {"memory": MemoryStore(), "file": FileStore(temp)}
+            for store in stores.values():
+                store.put("upload", histogram)
+
+            def from_session():
+                colors = json.loads(session["colors"])
+                return palette.sample(colors, 8, 75)
+
+            def from_store(store):
+                return lambda: palette.sample(store.get("upload"), 8, 75)
+
+            variants = [("json session", from_session, len(session["colors"]))]
+            variants += [
+                (f"{name} store", from_store(store), len("upload"))
+                for name, store in stores.items()
+            ]
+            for name, resample, session_bytes in variants:
+                median, p95 = latency(resample)
+                rows.append(
+                    (
+                        size,
+                        len(histogram),
+                        name,
+                        session_bytes,
+                        f"{median:.2f}",
+                        f"{p95:.2f}",
+                    )
+                )
+
+    report(
+        f"Resample latency over {REQUESTS} requests (ms)",
+        ("size", "colors", "colors from", "session bytes", "median", "p95"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Compare peak memory of `process_image` against `stream_image` on a large image."""
+
+import resource
+import sys
+
+from multiprocessing import get_context
+
+from common import photo_image, report
+from swatcher import color, image
+
+SIZE = 6000
+
+
+def peak_mb() -> float:
+    """Peak resident memory of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports kilobytes
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def measure(name: str) -> tuple:
+    """Process a large transparent image and return (baseline, peak) MB."""
+    source = photo_image(SIZE, "RGBA")
+    source.putpixel((SIZE // 2, SIZE // 2), (0, 0, 0, 0))
+    baseline = peak_mb()
+    if name == "process_image":
+        image.process_image(source)
+    elif name == "stream_image":
+        image.stream_image(source)
+    elif name == "process_image full":
+        color.get_histogram(image.process_image(source, max_size=None))
+    else:
+        image.stream_histogram(source)
+    return baseline, peak_mb()
+
+
+def main():
+    rows = []
+    names = ("process_image", "stream_image", "process_image full", "stream_histogram")
+    for name in names:
+        # a fresh process per run so the peaks don't mix
+        with get_context("spawn").Pool(1) as pool:
+            baseline, peak = pool.apply(measure, (name,))
+        rows.append((name, f"{peak - baseline:.0f}"))
+    report(
+        f"Extra peak memory processing a {SIZE}px RGBA image ({SIZE * SIZE * 4 / 2 ** 20:.0f}MB)",
+        ("pipeline", "MB"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
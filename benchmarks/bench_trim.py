@@ -0,0 +1,40 @@
+"""Compare `trim_excess` against trimming with a full size difference image."""
+
+from common import best_of, photo_image, report
+from PIL import Image, ImageChops
+from swatcher import image
+
+
+def difference_trim(img: object, bg_pixel: tuple) -> object:
+    """The previous `trim_excess`, a full size background and difference."""
+    comp = Image.new("RGB", img.size, bg_pixel)
+    return img.crop(ImageChops.difference(img, comp).getbbox())
+
+
+def main():
+    rows = []
+    photo = photo_image(1000)
+    for name, margin in (("no margin", 0), ("50px margin", 50), ("wide margin", 1500)):
+        img = Image.new("RGB", (6000, 4000), (255, 255, 255))
+        content = photo.resize((6000 - margin * 2, 4000 - margin * 2))
+        img.paste(content, (margin, margin))
+        # white corners so there's a background to trim
+        for xy in ((0, 0), (5999, 0), (0, 3999), (5999, 3999)):
+            img.putpixel(xy, (255, 255, 255))
+        rows.append(
+            (
+                name,
+                f"{best_of(lambda: difference_trim(img, (255, 255, 255))):.1f}",
+                f"{best_of(lambda: image.trim_excess(img)):.1f}",
+                f"{best_of(lambda: image.trim_excess(img, proxy_size=500)):.1f}",
+            )
+        )
+    report(
+        "trim_excess on a 6000x4000 image (ms)",
+        ("image", "difference", "edge scan", "proxy 500"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
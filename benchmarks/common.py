@@ -0,0 +1,46 @@
+"""
+Shared helpers for the Swatcher benchmark scripts.
+
+Run any benchmark from the repository root, eg.
+
+    python benchmarks/bench_histogram.py
+"""
+
+import os
+import sys
+import timeit
+
+from PIL import Image
+
+# make the local `swatcher` package importable without installing it
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def photo_image(size: int, mode: str = "RGB") -> object:
+    """
+    Generate a photograph-like test image with smooth gradients and
+    plenty of noise so it contains a large number of distinct colors.
+
+    :param size: width and height of the image in pixels
+    :param mode: PIL image mode of the returned image
+    :returns: PIL Image object
+    """
+    r = Image.linear_gradient("L").resize((size, size))
+    g = r.rotate(90)
+    b = Image.effect_noise((size, size), 64)
+    image = Image.merge("RGB", (r, g, b))
+    noise = Image.effect_noise((size, size), 16).convert("RGB")
+    return Image.blend(image, noise, 0.2).convert(mode)
+
+
+def best_of(func, repeat: int = 3, number: int = 1) -> float:
+    """Time `func` and return the best run in milliseconds."""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1000
+
+
+def report(title: str, header: tuple, rows: list):
+    """Print a simple aligned results table."""
+    print(f"\n{title}")
+    widths = [max(len(str(x)) for x in col) for col in zip(header, *rows)]
+    for row in [header] + rows:
+        print("  ".join(str(x).rjust(w) for x, w in zip(row, widths)))
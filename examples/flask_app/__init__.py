@@ -2,11 +2,15 @@ from .config import Config
 from flask import Flask
 from flask_session import Session
 from flask_debugtoolbar import DebugToolbarExtension
+from swatcher.store import FileStore
 
 
 app = Flask(__name__)
 app.config.from_object(Config)
 Session(app)
 toolbar = DebugToolbarExtension(app)
+histograms = FileStore(
+    app.config["HISTOGRAM_STORE_DIR"], ttl=app.config["PERMANENT_SESSION_LIFETIME"]
+)
 
 from . import routes
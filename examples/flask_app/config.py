@@ -14,6 +14,8 @@ class Config:
     SESSION_TYPE = "filesystem"
     SESSION_FILE_DIR = "examples/flask_app/flask_session"
     PERMANENT_SESSION_LIFETIME = 1800
+    # uploaded image color histograms, the session only keeps the upload id
+    HISTOGRAM_STORE_DIR = "examples/flask_app/histograms"
     # flask debig toolbar setup
     DEBUG_TB_INTERCEPT_REDIRECTS = False
     # set max upload size to 5MB
@@ -14,7 +14,7 @@ from flask import (
     session,
     url_for,
 )
-from . import app
+from . import app, histograms
 from .forms import UploadImage, ResampleImage
 from io import BytesIO
 from PIL import Image
@@ -25,10 +25,11 @@ def reset_session_vars():
     resets all image flask session variables
     """
 
+    if "id" in session:
+        histograms.delete(session["id"])
     session.pop("id", None)
     session.pop("filename", None)
     session.pop("image_path", None)
-    session.pop("colors", None)
     session.pop("palette", None)
     session["max_colors"] = 8
     session["sensitivity"] = 75
@@ -89,11 +90,14 @@ def index():
             # including the RGB values, Hex code, and CMYK values
             colors = swatcher.color.colors_2_dicts(colors)
 
+            # keep the color histogram on the server, the session only
+            # needs the id to look it up when resampling
+            histograms.put(random_hex, image._colors)
+
             # set session values
             session["id"] = random_hex
             session["filename"] = filename
             session["image_path"] = image_path
-            session["colors"] = json.dumps(image._colors)
             session["palette"] = json.dumps(colors)
 
             return render_template(
@@ -109,14 +113,14 @@ def index():
 
     # if resample_form was submitted instead
     elif resample_form.resample.data:
-        if resample_form.validate_on_submit():
+        colors = histograms.get(session["id"]) if "id" in session else None
+        if colors is not None and resample_form.validate_on_submit():
 
             # get update sampling values from user and save them
             max_colors = int(resample_form.colors.data)
             sensitivity = int(resample_form.sensitivity.data)
 
-            # get stored image colors and resample them using new settings
-            colors = json.loads(session.get("colors"))
+            # resample the stored image colors using new settings
             colors = swatcher.palette.sample(
                 colors=colors, max_colors=max_colors, sensitivity=sensitivity
             )
@@ -136,8 +140,8 @@ def index():
                 colors=colors,
             )
 
-    # if session has expired then start over from scratch
-    if "id" not in session:
+    # if session (or the stored colors) has expired then start over from scratch
+    if "id" not in session or histograms.get(session["id"]) is None:
         reset_session_vars()
         flash("Sorry, your session has expired! Reupload.", "warning")
         return render_template("upload.html", upload_form=upload_form)
@@ -154,8 +158,10 @@ def palette():
         # grab session information
         id = session.get("id")
         colors = [tuple(color["rgb"]) for color in json.loads(session.get("palette"))]
-        # create adobe ase swatch file
-        file = swatcher.export.write_ase_file(colors)
+        # encode the adobe ase swatch file in memory
+        file = BytesIO()
+        swatcher.export.write_ase(colors, file)
+        file.seek(0)
         # return the file as a download
         return send_file(file, download_name=f"SWATCHER-{id}.ase", as_attachment=True)
     else:
@@ -21,5 +21,7 @@ setup(
     keywords=["adobe", "color", "swatches"],
     packages=find_packages(include=["swatcher"]),
     install_requires=["Pillow"],
+    extras_require={"numpy": ["numpy"]},
+    entry_points={"console_scripts": ["swatcher=swatcher.cli:main"]},
     python_requires=">=3.8",
 )
@@ -14,7 +14,8 @@ import os
 
 from datetime import datetime
 from PIL import Image
-from . import color, export, image, palette
+from . import aio, cache, cluster, color, export, histogram, image, palette
+from .histogram import open_histogram
 
 
 def get_file_info(file: object) -> tuple:
@@ -40,31 +41,176 @@ def validate_path(path: str):
         raise FileNotFoundError("Sorry, the save location doesn't exist.")
 
 
+def validate_max_colors(value: int):
+    """Check `max_colors` is an integer between 1 and 20."""
+    if type(value) != int:
+        raise TypeError("Max Colors must be an integer.")
+    elif not 1 <= value <= 20:
+        raise ValueError("Max Colors must be an integer between 1 and 20.")
+
+
+def validate_sensitivity(value: int):
+    """Check `sensitivity` is an integer between 0 and 250."""
+    if type(value) != int:
+        raise TypeError("Sensitivity must be an integer.")
+    elif not 0 <= value <= 250:
+        raise ValueError("Sensitivity must be an integer between 0 and 250.")
+
+
+def validate_max_candidates(value: int):
+    """Check `max_candidates` is None or a positive integer."""
+    if value is None:
+        return
+    if type(value) != int:
+        raise TypeError("Max Candidates must be an integer.")
+    elif value < 1:
+        raise ValueError("Max Candidates must be a positive integer.")
+
+
+def validate_metric(value: str):
+    """Check `metric` is a known color distance metric."""
+    if value not in color.DISTANCE_METRICS:
+        raise ValueError(f"Metric must be one of {color.DISTANCE_METRICS}.")
+
+
+def validate_method(value: str):
+    """Check `method` is "greedy" or one of the cluster methods."""
+    methods = ("greedy",) + cluster.CLUSTER_METHODS
+    if value not in methods:
+        raise ValueError(f"Method must be one of {methods}.")
+
+
+def validate_max_size(value: int):
+    """Check `max_size` is None or a positive integer."""
+    if value is None:
+        return
+    if type(value) != int:
+        raise TypeError("Max Size must be an integer.")
+    elif value < 1:
+        raise ValueError("Max Size must be a positive integer.")
+
+
+def validate_coverage(value: float):
+    """Check `coverage` is None or a number between 0 and 1."""
+    if value is None:
+        return
+    if type(value) not in (int, float):
+        raise TypeError("Coverage must be a number.")
+    elif not 0 < value <= 1:
+        raise ValueError("Coverage must be a number between 0 and 1.")
+
+
 class Swatcher:
     """
     This class represents a Swatcher object used for sampling colors
     from an image and exporting them as Adobe ASE color swatches.
     """
 
-    def __init__(self, file, max_colors: int = None, sensitivity: int = None):
+    def __init__(
+        self,
+        file,
+        max_colors: int = None,
+        sensitivity: int = None,
+        histogram_engine: str = None,
+        index: bool = False,
+        max_candidates: int = None,
+        coverage: float = None,
+        quantize=None,
+        draft: bool = False,
+        cache: object = None,
+        max_size: int = 500,
+        stream: bool = False,
+        metric: str = "rgb",
+        method: str = "greedy",
+        histogram: object = None,
+    ):
         """
         Initialize an image for color sampling.
 
         :param `file`: a filename (string) or file object in binary mode
+        :param histogram_engine: engine used to count colors ("numpy" or "python")
+        :param index: build a `palette.SensitivityIndex` (on first sample) so
+                      changing the sample settings is a lookup instead of a
+                      new sample
+        :param max_candidates: only consider the `max_candidates` most
+                               common colors when sampling
+        :param coverage: only consider the most common colors covering
+                         this share (0-1) of all pixels when sampling
+        :param quantize: bound the colors counted from the image, bits per
+                         channel (1-8) or a quantize method ("median-cut"
+                         or "octree"), see `image.process_image`
+        :param draft: decode large images close to the processing size
+                      (JPEG draft mode) instead of at full resolution
+        :param cache: `cache.HistogramCache` to reuse the colors counted
+                      from identical images processed before
+        :param max_size: maximum size the image is reduced to before counting
+                         colors, None counts every pixel at full resolution
+        :param stream: process the image one strip at a time so very large
+                       images never get a full size processed copy, see
+                       `image.stream_image` and `image.stream_histogram`
+        :param metric: color distance metric used when sampling, "rgb"
+                       or the perceptual "cie76" or "ciede2000", see
+                       `self.metric`
+        :param method: palette extraction method, see `self.method`
+        :param histogram: `histogram.ColorHistogram` or the path of a
+                          histogram saved with `self.save_histogram` to
+                          use instead of counting the colors, histogram
+                          files are memory-mapped so worker processes
+                          share one copy
         """
         self.image = Image.open(file)
+        self._file = file
         self._max_colors = 8
         self._sensitivity = 75
         self._palette = None
         self._palette_image = None
+        self._index = None
+        self._use_index = index
+        self._report = None
+        self.max_candidates = max_candidates
+        self.coverage = coverage
+        self.metric = metric
+        self.method = method
         # get or set the file path
         self.path = get_file_info(self.image)
-        # process image for color sampling
-        self._processed_image = image.process_image(self.image)
-        # count and sort colors from every pixel
-        self._colors = color.get_colors(self._processed_image)
-        # sample the image
-        self.sample(max_colors, sensitivity)
+        # every pipeline stage runs on first access, see `self._colors`
+        validate_max_size(max_size)
+        image.validate_quantize(quantize)
+        self._process_options = {
+            "max_size": max_size,
+            "quantize": quantize,
+            "draft": draft,
+        }
+        self._stream = stream
+        self._processed_image = None
+        self._histogram_engine = histogram_engine
+        self._cache = cache
+        if isinstance(histogram, (str, os.PathLike)):
+            histogram = open_histogram(histogram)
+        self._histogram = histogram
+        # validate the sample settings, the image is sampled on first access
+        if max_colors:
+            self.max_colors = max_colors
+        if sensitivity or sensitivity == 0:
+            self.sensitivity = sensitivity
+
+    @classmethod
+    async def open_async(cls, file, **options) -> "Swatcher":
+        """
+        Open, process and count the colors of an image on the `aio`
+        thread pool without blocking the event loop.
+
+        :param `file`: a filename (string) or file object in binary mode
+        :param options: `Swatcher` options eg. max_colors=5
+        :returns: Swatcher object
+        """
+
+        def open_image():
+            s = cls(file, **options)
+            s._colors
+            return s
+
+        return await aio.run(open_image)
 
     @property
     def palette(self) -> list:
@@ -74,7 +220,7 @@ class Swatcher:
 
         :returns: list of rgb color tuples
         """
-        if not self._palette:
+        if self._palette is None:
             self.sample(self._max_colors, self._sensitivity)
         return self._palette
 
@@ -85,10 +231,7 @@ class Swatcher:
 
     @max_colors.setter
     def max_colors(self, value: int):
-        if type(value) != int:
-            raise TypeError("Max Colors must be an integer.")
-        elif not 1 <= value <= 20:
-            raise ValueError("Max Colors must be an integer between 1 and 20.")
+        validate_max_colors(value)
         self._max_colors = value
         self._reset_current_palette()
 
@@ -102,18 +245,133 @@ class Swatcher:
 
     @sensitivity.setter
     def sensitivity(self, value: int):
-        if type(value) != int:
-            raise TypeError("Sensitivity must be an integer.")
-        elif not 0 <= value <= 250:
-            raise ValueError("Sensitivity must be an integer between 0 and 250.")
+        validate_sensitivity(value)
         self._sensitivity = value
         self._reset_current_palette()
 
+    @property
+    def max_candidates(self) -> int:
+        """
+        Maximum number of the most common colors to consider during
+        sampling, caps the sampling time on images with many colors.
+        """
+        return self._max_candidates
+
+    @max_candidates.setter
+    def max_candidates(self, value: int):
+        validate_max_candidates(value)
+        self._max_candidates = value
+        self._index = None
+        self._reset_current_palette()
+
+    @property
+    def coverage(self) -> float:
+        """
+        Share (0-1) of all pixels the colors considered during sampling
+        must cover, caps the sampling time on images with many colors.
+        """
+        return self._coverage
+
+    @coverage.setter
+    def coverage(self, value: float):
+        validate_coverage(value)
+        self._coverage = value
+        self._index = None
+        self._reset_current_palette()
+
+    @property
+    def metric(self) -> str:
+        """
+        Color distance metric used when sampling. "rgb" compares the
+        Euclidean distance of RGB values, the perceptual "cie76" and
+        "ciede2000" compare CIELAB colors and `self.sensitivity` is the
+        ΔE color difference (2-3 is barely noticeable).
+        """
+        return self._metric
+
+    @metric.setter
+    def metric(self, value: str):
+        validate_metric(value)
+        self._metric = value
+        self._reset_current_palette()
+
+    @property
+    def method(self) -> str:
+        """
+        Palette extraction method. "greedy" samples the most common
+        colors using `self.sensitivity`, "kmeans" and "median-cut"
+        cluster the color histogram into `self.max_colors` colors (see
+        `cluster.kmeans` and `cluster.median_cut`).
+        """
+        return self._method
+
+    @method.setter
+    def method(self, value: str):
+        validate_method(value)
+        self._method = value
+        self._reset_current_palette()
+
+    @property
+    def sample_report(self) -> object:
+        """
+        `palette.SampleReport` of how much of the color histogram was
+        considered for the current palette (None if it was looked up
+        from `self.index`), or a `cluster.ClusterReport` with the pixel
+        coverage of each swatch when clustering.
+        """
+        return self._report
+
     @property
     def processed_image(self):
         """Processed `self.image` PIL image object."""
+        if self._processed_image is None:
+            process = image.stream_image if self._stream else image.process_image
+            self._processed_image = process(self.image, **self._process_options)
         return self._processed_image
 
+    @property
+    def _colors(self) -> object:
+        """
+        `histogram.ColorHistogram` of all colors of `self.processed_image`
+        sorted by most common, counted on first access (or loaded from
+        the histogram cache).
+        """
+        if self._histogram is None:
+            self._histogram = self._count_colors()
+        return self._histogram
+
+    @property
+    def _counts(self) -> object:
+        """Pixel count of each color in `self._colors`."""
+        return self._colors.counts
+
+    def _count_colors(self) -> object:
+        """Count the colors of `self.processed_image` using the cache if set."""
+        cache, key = self._cache, None
+        if cache is not None:
+            key = cache.key(self._file, **self._process_options)
+            histogram = cache.get(key)
+            if histogram is not None:
+                return histogram
+        options = self._process_options
+        if (
+            self._stream
+            and options["max_size"] is None
+            and not isinstance(options["quantize"], str)
+        ):
+            # count full resolution images strip by strip, quantize
+            # methods need the whole image so they use `processed_image`
+            histogram = image.stream_histogram(
+                self.image, options["quantize"], engine=self._histogram_engine
+            )
+        else:
+            histogram = color.get_histogram(
+                self.processed_image, self._histogram_engine
+            )
+        if cache is not None:
+            cache.put(key, histogram)
+        return histogram
+
     @property
     def palette_image(self) -> object:
         """
@@ -125,7 +383,14 @@ class Swatcher:
             self._palette_image = palette.draw_swatches(self.palette)
         return self._palette_image
 
-    def sample(self, max_colors: int = None, sensitivity: int = None) -> list:
+    def sample(
+        self,
+        max_colors: int = None,
+        sensitivity: int = None,
+        metric: str = None,
+        method: str = None,
+        **options,
+    ) -> list:
         """
         Sample a new palette from `self.image` using the supplied sample
         settings `max_colors` and `sensitivity` or the defaults.
@@ -133,19 +398,116 @@ class Swatcher:
         :param max_colors: maximum colors to sample from `self.image`
         :param sensitivity: how perceptively different (Euclidean Distance) a color
                           must be from others to be included in the sampled palette.
+        :param metric: color distance metric, see `self.metric`
+        :param method: palette extraction method, see `self.method`
+        :param options: extra clustering options eg. `seed`, `max_iter`
+                        or `time_budget` for "kmeans"
         :returns: list of rgb color tuples
         """
         if max_colors:
             self.max_colors = max_colors
         if sensitivity or sensitivity == 0:
             self.sensitivity = sensitivity
+        if metric:
+            self.metric = metric
+        if method:
+            self.method = method
 
         self._reset_current_palette()
-        self._palette = palette.sample(
-            self._colors, self._max_colors, self._sensitivity
-        )
+        if self._method != "greedy":
+            self._report = cluster.cluster(
+                self._candidates(), self._max_colors, self._method, **options
+            )
+            self._palette = self._report.palette
+            return self.palette
+        # the index is built with the "rgb" metric
+        use_index = self._use_index and self._metric == "rgb"
+        if use_index and self._index is None:
+            self.build_index()
+        if use_index and self._index:
+            self._palette = self._index.lookup(self._max_colors, self._sensitivity)
+        if self._palette is None:
+            self._report = palette.sample_report(
+                self._colors,
+                self._max_colors,
+                self._sensitivity,
+                self._max_candidates,
+                self._coverage,
+                self._counts,
+                self._metric,
+            )
+            self._palette = self._report.palette
         return self.palette
 
+    async def sample_async(self, *args, **kwargs) -> list:
+        """
+        `self.sample` on the `aio` thread pool. Don't sample the same
+        Swatcher object from more than one task at once.
+
+        :returns: list of rgb color tuples
+        """
+        return await aio.run(self.sample, *args, **kwargs)
+
+    def sample_many(self, settings: list) -> list:
+        """
+        Sample palettes from `self.image` for many sample settings at once
+        without changing the current `self.max_colors` and `self.sensitivity`.
+
+        :param settings: list of (max_colors, sensitivity) tuples
+        :returns: list of palettes (lists of rgb color tuples) in the
+                  same order as `settings`
+        """
+        for max_colors, sensitivity in settings:
+            validate_max_colors(max_colors)
+            validate_sensitivity(sensitivity)
+        if self._method != "greedy":
+            colors = self._candidates()
+            return [
+                cluster.cluster(colors, m, self._method).palette for m, _ in settings
+            ]
+        if self._index and self._metric == "rgb":
+            palettes = [self._index.lookup(m, s) for m, s in settings]
+            if None not in palettes:
+                return palettes
+        return palette.sample_many(self._candidates(), settings, self._metric)
+
+    def save_histogram(self, path: str) -> str:
+        """
+        Save the color histogram of `self.image` to a binary file that
+        other processes can open (memory-mapped, without copying) with
+        `Swatcher(file, histogram=path)` or `histogram.open_histogram`.
+
+        :param `path`: a filename string
+        :returns: file location
+        :exception FileNotFoundError: If the save location doesn't exist
+        """
+        validate_path(os.path.abspath(path))
+        self._colors.save(path)
+        return path
+
+    @property
+    def index(self) -> object:
+        """`palette.SensitivityIndex` of `self.image` colors (if built)."""
+        return self._index
+
+    def build_index(self, max_candidates: int = None) -> object:
+        """
+        Precompute the palette for every sample setting so updating
+        `self.max_colors` or `self.sensitivity` becomes a lookup.
+
+        The memory used and time taken are available as `index.nbytes`
+        and `index.build_time`.
+
+        :param max_candidates: maximum number of colors to walk while
+                               building, settings the index can't answer
+                               fall back to `palette.sample`
+        :returns: `palette.SensitivityIndex` object
+        """
+        self._index = palette.SensitivityIndex(
+            self._candidates(), max_candidates=max_candidates
+        )
+        return self._index
+
     def show_processed_image(self):
         """Show `self.processed_image` in your standard image viewer."""
         self.processed_image.show()
@@ -177,6 +539,16 @@ class Swatcher:
         exported_file = export.export_ase_file(self.palette, path)
         return exported_file
 
+    async def export_ase_file_async(self, path: str = None) -> str:
+        """
+        `self.export_ase_file` on the `aio` thread pool.
+
+        :param `path`: a filename string
+        :returns: file location
+        :exception FileNotFoundError: If the save location doesn't exist
+        """
+        return await aio.run(self.export_ase_file, path)
+
     def export_palette_image(self, path: str = None) -> str:
         """
         Export a PNG version of `self.palette_image`.
@@ -200,10 +572,20 @@ class Swatcher:
         exported_file = export.export_image_file(self.palette_image, path)
         return exported_file
 
+    def _candidates(self) -> list:
+        """Colors considered during sampling using the current budget."""
+        if self._max_candidates is None and self._coverage is None:
+            return self._colors
+        limit = palette.candidate_limit(
+            self._colors, self._max_candidates, self._coverage, self._counts
+        )
+        return self._colors[:limit]
+
     def _reset_current_palette(self):
         """Reset instance palette after sample settings update."""
         self._palette = None
         self._palette_image = None
+        self._report = None
 
     def __repr__(self):
         return repr(
@@ -0,0 +1,125 @@
+"""
+    Swatcher asyncio API
+    --------------------
+    Run the blocking parts of Swatcher (decoding, counting colors,
+    sampling and exporting) on a bounded thread pool so they don't
+    block the event loop of an async web service.
+
+    s = await Swatcher.open_async(file)
+    colors = await s.sample_async(max_colors=5)
+    fp = await export_ase_async(colors, "/path/to/swatches")
+"""
+
+import asyncio
+import os
+import weakref
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from . import export
+
+_executor = None
+_max_workers = None
+_max_concurrent = None
+# semaphores belong to an event loop so keep one per running loop
+_limits = weakref.WeakKeyDictionary()
+
+
+def configure(max_workers: int = None, max_concurrent: int = None):
+    """
+    Set the size of the thread pool and how many calls may be queued
+    or running at once. Calls over the limit wait on the event loop
+    instead of piling up in the thread pool queue.
+
+    Calling `configure()` without arguments restores the defaults.
+
+    :param max_workers: number of worker threads (defaults to the
+                        number of cores, at most 8)
+    :param max_concurrent: maximum calls queued or running at once
+                           (defaults to twice `max_workers`)
+    """
+    global _executor, _max_workers, _max_concurrent
+    if max_workers is not None and max_workers < 1:
+        raise ValueError("Max workers must be at least 1.")
+    if max_concurrent is not None and max_concurrent < 1:
+        raise ValueError("Max concurrent must be at least 1.")
+    if _executor is not None:
+        # let running calls finish, new calls use the new pool
+        _executor.shutdown(wait=False)
+    _executor = None
+    _max_workers = max_workers
+    _max_concurrent = max_concurrent
+    _limits.clear()
+
+
+def _workers() -> int:
+    return _max_workers or min(8, os.cpu_count() or 1)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=_workers(), thread_name_prefix="swatcher"
+        )
+    return _executor
+
+
+def _get_limit() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    limit = _limits.get(loop)
+    if limit is None:
+        limit = _limits[loop] = asyncio.Semaphore(_max_concurrent or 2 * _workers())
+    return limit
+
+
+async def run(func, *args, **kwargs):
+    """
+    Run a blocking function on the Swatcher thread pool.
+
+    Cancelling the awaiting task cancels the call if it hasn't started
+    yet. A call that is already running can't be interrupted, it keeps
+    its concurrency slot until it finishes and its result is discarded.
+
+    :param func: blocking function to run
+    :param args: positional arguments for `func`
+    :param kwargs: keyword arguments for `func`
+    :returns: return value of `func`
+    """
+    loop = asyncio.get_running_loop()
+    limit = _get_limit()
+    await limit.acquire()
+    try:
+        future = _get_executor().submit(partial(func, *args, **kwargs))
+    except BaseException:
+        limit.release()
+        raise
+    # release the slot once the call is done (or cancelled before starting)
+    future.add_done_callback(lambda _: loop.call_soon_threadsafe(limit.release))
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+
+
+async def write_ase_async(colors: list) -> object:
+    """
+    Encode an Adobe ASE file without blocking the event loop.
+
+    :param colors: a list of RGB color tuples (or lists)
+    :returns: temporary file object, see `export.write_ase_file`
+    """
+    return await run(export.write_ase_file, colors)
+
+
+async def export_ase_async(colors: list, path: str) -> str:
+    """
+    Export an Adobe ASE file without blocking the event loop.
+
+    :param colors: a list of RGB color tuples (or lists)
+    :param `path`: a filename string
+    :returns: export location in filesystem
+    :exception OSError: swatches could not be exported
+    """
+    return await run(export.export_ase_file, colors, path)
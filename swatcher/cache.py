@@ -0,0 +1,194 @@
+import hashlib
+import os
+import tempfile
+
+from .histogram import ColorHistogram
+
+# image files are hashed in chunks of this many bytes so a large image
+# is never read into memory all at once
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(digest: object, file) -> object:
+    """
+    Feed all bytes of a filename or file object into a hash in
+    `HASH_CHUNK_SIZE` chunks, leaving the file object at the position
+    it was at.
+
+    :param digest: hashlib hash object
+    :param file: a filename (string) or file object in binary mode
+    :returns: `digest`
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            return hash_file(digest, f)
+    # PIL (or an earlier read) may have moved the position, always hash
+    # the whole file so different images never share a cache key
+    position = file.tell()
+    file.seek(0)
+    try:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    finally:
+        file.seek(position)
+    return digest
+
+
+class HistogramCache:
+    """
+    Content-addressed on-disk cache of color histograms.
+
+    Histograms are stored in the compact binary format of
+    `ColorHistogram.to_bytes`.
+
+    Entries are keyed by a hash of the image file bytes plus the options
+    used to process the image, so re-running Swatcher on an unchanged
+    image can skip straight to sampling. The cache is kept under
+    `max_bytes` by evicting the least recently used entries.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Initialize a histogram cache.
+
+        :param directory: directory to store cached histograms in
+        :param max_bytes: maximum total size of all cached histograms
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = sum(size for _, size, _ in self._stat_entries())
+
+    @staticmethod
+    def key(data, **options) -> str:
+        """
+        Build a cache key from the image file and processing options.
+
+        :param data: image file bytes, filename or file object
+        :param options: options used to process the image eg. max_size=500
+        :returns: hex digest cache key
+        """
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            digest = hashlib.sha256(data)
+        else:
+            digest = hash_file(hashlib.sha256(), data)
+        digest.update(repr(sorted(options.items())).encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".swch")
+
+    def _entries(self) -> list:
+        return [
+            os.path.join(self.directory, fn)
+            for fn in os.listdir(self.directory)
+            if fn.endswith(".swch")
+        ]
+
+    def _stat_entries(self) -> list:
+        # (last used, size, path) of every entry still on disk, other
+        # processes may remove entries at any time
+        stats = []
+        for fp in self._entries():
+            try:
+                stats.append((os.path.getmtime(fp), os.path.getsize(fp), fp))
+            except OSError:
+                continue
+        return stats
+
+    def get(self, key: str) -> tuple:
+        """
+        Get a cached histogram.
+
+        :param key: cache key from `HistogramCache.key`
+        :returns: `ColorHistogram` object or None
+        """
+        fp = self._path(key)
+        try:
+            with open(fp, "rb") as file:
+                histogram = ColorHistogram.from_bytes(file.read())
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self._touch(fp)
+        self.hits += 1
+        return histogram
+
+    @staticmethod
+    def _touch(fp: str):
+        # mark the entry as recently used, another process may have
+        # evicted it since it was read
+        try:
+            os.utime(fp)
+        except OSError:
+            pass
+
+    def put(self, key: str, histogram: ColorHistogram):
+        """
+        Cache a histogram, evicting the least recently used entries
+        if the cache grows over `max_bytes`.
+
+        :param key: cache key from `HistogramCache.key`
+        :param histogram: `ColorHistogram` object
+        """
+        data = histogram.to_bytes()
+        fp = self._path(key)
+        try:
+            self._size -= os.path.getsize(fp)
+        except OSError:
+            pass
+        # write to a temporary file first so readers never see a partial entry
+        fd, temp = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temp, fp)
+        except BaseException:
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+            raise
+        self._size += len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until under `max_bytes`."""
+        entries = sorted(self._stat_entries())
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, fp in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                os.remove(fp)
+            except OSError:
+                continue
+            self._size -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Remove every cached histogram."""
+        for fp in self._entries():
+            try:
+                os.remove(fp)
+            except OSError:
+                continue
+        self._size = 0
+
+    @property
+    def stats(self) -> dict:
+        """Cache hits, misses, evictions, entries and total size in bytes."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries()),
+            "bytes": self._size,
+        }
+
+    def __repr__(self):
+        return f"HistogramCache({self.directory!r}, {self.stats})"
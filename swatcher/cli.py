@@ -0,0 +1,367 @@
+"""
+    Swatcher command line interface
+    -------------------------------
+    Batch export Adobe ASE swatches and palette images from many images
+    using every core available.
+
+    $ swatcher path/to/images/ *.png --workers 8 --output exports/
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from . import Swatcher, __version__
+
+IMAGE_EXTENSIONS = (
+    ".bmp",
+    ".gif",
+    ".jpeg",
+    ".jpg",
+    ".png",
+    ".psd",
+    ".tif",
+    ".tiff",
+    ".webp",
+)
+
+
+def find_files(paths: list, recursive: bool = False) -> list:
+    """
+    Expand a list of files, directories and glob patterns into image files.
+
+    :param paths: list of file paths, directory paths or glob patterns
+    :param recursive: search directories (and `**` patterns) recursively
+    :returns: sorted list of image file paths
+    """
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            pattern = (
+                os.path.join(path, "**", "*") if recursive else os.path.join(path, "*")
+            )
+            matches = glob.glob(pattern, recursive=recursive)
+            files.update(
+                fp
+                for fp in matches
+                if os.path.isfile(fp) and fp.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        elif os.path.isfile(path):
+            files.add(path)
+        else:
+            files.update(
+                fp for fp in glob.glob(path, recursive=recursive) if os.path.isfile(fp)
+            )
+    return sorted(files)
+
+
+def glob_root(pattern: str) -> str:
+    """Directory part of a glob pattern before the first wildcard."""
+    parts = []
+    for part in pattern.split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts) or os.curdir
+
+
+def output_names(paths: list, files: list) -> dict:
+    """
+    Name every exported file by its path relative to the input directory
+    (or glob pattern) it was found in, so same-named images in different
+    directories don't overwrite each other in the `--output` directory.
+
+    :param paths: file paths, directory paths or glob patterns searched
+    :param files: image file paths found by `find_files`
+    :returns: dict of image file path to relative output name
+    """
+    roots = []
+    for path in paths:
+        if os.path.isdir(path):
+            roots.append(path)
+        elif not os.path.isfile(path):
+            roots.append(glob_root(path))
+    names = {}
+    for fp in files:
+        name = os.path.basename(fp)
+        for root in roots:
+            relative = os.path.relpath(fp, root)
+            if not relative.startswith(os.pardir + os.sep):
+                name = relative
+                break
+        names[fp] = name
+    return names
+
+
+def export_file(path: str, options: dict, name: str = None) -> list:
+    """
+    Sample a single image and export its swatches.
+
+    :param path: image file path
+    :param options: Swatcher and export options
+    :param name: output name relative to the `output` directory
+                 (defaults to the image file name)
+    :returns: list of exported file locations
+    """
+    s = Swatcher(
+        path,
+        max_colors=options["max_colors"],
+        sensitivity=options["sensitivity"],
+        quantize=options["quantize"],
+        draft=options["draft"],
+    )
+    export_path = None
+    if options["output"]:
+        export_path = os.path.join(options["output"], name or os.path.basename(path))
+        os.makedirs(os.path.dirname(export_path), exist_ok=True)
+    exported = []
+    if options["ase"]:
+        exported.append(s.export_ase_file(export_path))
+    if options["image"]:
+        exported.append(s.export_palette_image(export_path))
+    return exported
+
+
+def export_chunk(paths: list, options: dict, names: dict = None) -> list:
+    """
+    Export a chunk of images in a worker process.
+
+    Errors are caught per file so one bad image doesn't fail the chunk.
+
+    :param paths: list of image file paths
+    :param options: Swatcher and export options
+    :param names: dict of image file path to output name
+    :returns: list of (path, exported file locations, error message) tuples
+    """
+    names = names or {}
+    results = []
+    for path in paths:
+        try:
+            results.append((path, export_file(path, options, names.get(path)), None))
+        except Exception as e:
+            results.append((path, [], f"{type(e).__name__}: {e}"))
+    return results
+
+
+def chunked(items: list, size: int):
+    """Yield successive `size` long chunks of `items`."""
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def find_collisions(files: list, names: dict) -> dict:
+    """
+    Find images that would be exported to the same output name.
+
+    :param files: list of image file paths
+    :param names: dict of image file path to output name
+    :returns: dict of colliding image file path to error message
+    """
+    by_name = {}
+    for fp in files:
+        by_name.setdefault(names[fp], []).append(fp)
+    errors = {}
+    for name, paths in by_name.items():
+        if len(paths) > 1:
+            for fp in paths:
+                others = ", ".join(p for p in paths if p != fp)
+                errors[fp] = f"OutputCollision: {name} is also exported from {others}"
+    return errors
+
+
+def process_files(
+    files: list,
+    options: dict,
+    workers: int = None,
+    chunk_size: int = 16,
+    progress=None,
+    names: dict = None,
+) -> list:
+    """
+    Export swatches for many images on a process pool.
+
+    Files are submitted in chunks and only a few chunks per worker are
+    in flight at once, so memory stays flat no matter how many files.
+
+    With an `output` directory, images that would be exported to the
+    same name aren't exported and are reported as errors instead.
+    If a worker process dies (or a chunk fails outright) the files of
+    the chunks it took down are reported as errors and the remaining
+    chunks run on a new pool.
+
+    :param files: list of image file paths
+    :param options: Swatcher and export options
+    :param workers: number of worker processes (defaults to CPU count)
+    :param chunk_size: number of files sent to a worker at once
+    :param progress: optional callback called with (done, total) counts
+    :param names: dict of image file path to output name relative to
+                  the `output` directory (defaults to the file names)
+    :returns: list of (path, exported file locations, error message) tuples
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * 2
+    results = []
+    if options["output"]:
+        names = names or {fp: os.path.basename(fp) for fp in files}
+        collisions = find_collisions(files, names)
+        results.extend((fp, [], error) for fp, error in collisions.items())
+        files = [fp for fp in files if fp not in collisions]
+    total = len(files) + len(results)
+    chunks = chunked(files, chunk_size)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = {}
+        while True:
+            for chunk in chunks:
+                chunk_names = {fp: names[fp] for fp in chunk} if names else None
+                future = executor.submit(export_chunk, chunk, options, chunk_names)
+                pending[future] = chunk
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                chunk = pending.pop(future)
+                try:
+                    results.extend(future.result())
+                except Exception as e:
+                    broken = broken or isinstance(e, BrokenProcessPool)
+                    error = f"{type(e).__name__}: {e}"
+                    results.extend((fp, [], error) for fp in chunk)
+            if broken:
+                # every pending chunk of a broken pool fails, start over
+                # with a new pool for the chunks that haven't been sent
+                executor.shutdown(wait=False)
+                executor = ProcessPoolExecutor(max_workers=workers)
+            if progress:
+                progress(len(results), total)
+    finally:
+        executor.shutdown()
+    return results
+
+
+def positive_int(value: str) -> int:
+    """Parse an option that must be a whole number of at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value!r}")
+    return number
+
+
+def parse_quantize(value: str):
+    """Parse the `--quantize` option as a bit depth or quantize method."""
+    return int(value) if value.isdigit() else value
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="swatcher",
+        description="Generate Adobe ASE swatches from images.",
+    )
+    parser.add_argument(
+        "paths", nargs="+", help="image files, directories or glob patterns"
+    )
+    parser.add_argument(
+        "-c", "--max-colors", type=int, default=8, help="maximum colors to sample"
+    )
+    parser.add_argument(
+        "-s",
+        "--sensitivity",
+        type=int,
+        default=75,
+        help="how perceptively different sampled colors must be",
+    )
+    parser.add_argument(
+        "-o", "--output", help="export directory (defaults to each image's directory)"
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=positive_int,
+        help="worker processes (defaults to CPU count)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=positive_int,
+        default=16,
+        help="files sent to a worker at once",
+    )
+    parser.add_argument(
+        "-r", "--recursive", action="store_true", help="search directories recursively"
+    )
+    parser.add_argument(
+        "--no-ase", dest="ase", action="store_false", help="skip ASE swatch files"
+    )
+    parser.add_argument(
+        "--no-image", dest="image", action="store_false", help="skip palette images"
+    )
+    parser.add_argument(
+        "--quantize",
+        type=parse_quantize,
+        help="bits per channel (1-8), 'median-cut' or 'octree'",
+    )
+    parser.add_argument(
+        "--draft", action="store_true", help="decode large images at a reduced size"
+    )
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", help="don't show progress output"
+    )
+    parser.add_argument("--version", action="version", version=__version__)
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None) -> int:
+    """
+    Run the Swatcher command line interface.
+
+    :param argv: command line arguments (defaults to `sys.argv`)
+    :returns: exit code, 1 if any file failed
+    """
+    args = parse_args(argv)
+    if args.output and not os.path.isdir(args.output):
+        print(f"Error! {args.output} is not a directory.", file=sys.stderr)
+        return 2
+    files = find_files(args.paths, args.recursive)
+    if not files:
+        print("Error! No image files found.", file=sys.stderr)
+        return 2
+
+    options = {
+        "max_colors": args.max_colors,
+        "sensitivity": args.sensitivity,
+        "quantize": args.quantize,
+        "draft": args.draft,
+        "output": args.output,
+        "ase": args.ase,
+        "image": args.image,
+    }
+
+    def progress(done: int, total: int):
+        print(f"\rProcessed {done}/{total} images", end="", file=sys.stderr)
+
+    results = process_files(
+        files,
+        options,
+        args.workers,
+        args.chunk_size,
+        None if args.quiet else progress,
+        output_names(args.paths, files) if args.output else None,
+    )
+    if not args.quiet:
+        print(file=sys.stderr)
+
+    errors = [(path, error) for path, _, error in results if error]
+    if errors:
+        print(f"{len(errors)} of {len(files)} images failed:", file=sys.stderr)
+        for path, error in errors:
+            print(f"  {path}: {error}", file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,303 @@
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import accumulate
+from operator import mul
+from time import perf_counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from swatcher.histogram import ColorHistogram
+
+CLUSTER_METHODS = ("kmeans", "median-cut")
+
+ClusterReport = namedtuple("ClusterReport", ["palette", "weights", "iterations"])
+ClusterReport.__doc__ = """
+Clustered palette and how much of the image each swatch covers.
+
+palette: list of RGB color tuples sorted by coverage
+weights: share (0-1) of pixels closest to each palette color
+iterations: number of refinement passes (k-means) or box splits (median cut)
+"""
+
+
+def _weighted(colors: list, counts: list) -> tuple:
+    """Split `colors` into a list of RGB tuples and their pixel counts."""
+    if counts is None:
+        counts = getattr(colors, "counts", None)
+    colors = list(colors)
+    counts = list(counts) if counts is not None else [1] * len(colors)
+    if len(colors) != len(counts):
+        raise ValueError("Colors and counts must be the same length.")
+    return colors, counts
+
+
+def _report(palette: list, weights: list, iterations: int) -> ClusterReport:
+    """Build a `ClusterReport` sorted by coverage."""
+    order = sorted(range(len(palette)), key=lambda i: -weights[i])
+    return ClusterReport(
+        [palette[i] for i in order], [weights[i] for i in order], iterations
+    )
+
+
+def median_cut(colors: list, max_colors: int = 8, counts: list = None) -> object:
+    """
+    Extract a palette by repeatedly splitting the box of colors with the
+    widest channel range at its pixel-weighted median.
+
+    Works on the color histogram instead of raw pixels so it doesn't
+    slow down on large images, and gives the same palette every time.
+
+    :param colors: list of RGB color tuples or a `ColorHistogram`
+    :param max_colors: maximum number of colors to return
+    :param counts: pixel count of each color (defaults to the histogram
+                   counts or 1 per color)
+    :returns: `ClusterReport` named tuple
+    """
+    if np is not None:
+        data, weights = _color_arrays(colors, counts)
+        if not len(data):
+            return ClusterReport([], [], 0)
+        return _median_cut_numpy(data, weights, max_colors)
+    colors, counts = _weighted(colors, counts)
+    if not colors:
+        return ClusterReport([], [], 0)
+
+    channels = [list(values) for values in zip(*colors)]
+
+    def widest(box):
+        spreads = []
+        for values in channels:
+            box_values = list(map(values.__getitem__, box))
+            spreads.append(max(box_values) - min(box_values))
+        spread = max(spreads)
+        return (spread, spreads.index(spread), box)
+
+    boxes = [widest(list(range(len(colors))))]
+    splits = 0
+    while len(boxes) < max_colors:
+        # split the box with the widest channel range
+        spread, channel, box = max(boxes, key=lambda box: box[0])
+        if not spread:
+            break
+        boxes.remove((spread, channel, box))
+        box.sort(key=channels[channel].__getitem__)
+        # split at the pixel-weighted median, keeping both halves non-empty
+        box_counts = list(map(counts.__getitem__, box))
+        half = sum(box_counts) / 2
+        split = min(bisect_left(list(accumulate(box_counts)), half) + 1, len(box) - 1)
+        boxes.extend([widest(box[:split]), widest(box[split:])])
+        splits += 1
+
+    palette, weights = [], []
+    pixels = sum(counts)
+    for _, _, box in boxes:
+        box_counts = list(map(counts.__getitem__, box))
+        weight = sum(box_counts)
+        palette.append(
+            tuple(
+                round(sum(map(mul, map(values.__getitem__, box), box_counts)) / weight)
+                for values in channels
+            )
+        )
+        weights.append(weight / pixels)
+    return _report(palette, weights, splits)
+
+
+def _median_cut_numpy(data: object, weights: object, max_colors: int) -> object:
+    """NumPy `median_cut` splitting boxes of color indices."""
+
+    def widest(box):
+        values = data[box]
+        spreads = values.max(axis=0) - values.min(axis=0)
+        channel = int(spreads.argmax())
+        return (int(spreads[channel]), channel, box)
+
+    boxes = [widest(np.arange(len(data)))]
+    splits = 0
+    while len(boxes) < max_colors:
+        # split the box with the widest channel range
+        index = max(range(len(boxes)), key=lambda i: boxes[i][0])
+        spread, channel, box = boxes[index]
+        if not spread:
+            break
+        del boxes[index]
+        box = box[np.argsort(data[box, channel], kind="stable")]
+        # split at the pixel-weighted median, keeping both halves non-empty
+        totals = np.cumsum(weights[box])
+        split = int(np.searchsorted(totals, totals[-1] / 2)) + 1
+        split = min(split, len(box) - 1)
+        boxes.extend([widest(box[:split]), widest(box[split:])])
+        splits += 1
+
+    palette, shares = [], []
+    pixels = weights.sum()
+    for _, _, box in boxes:
+        box_weights = weights[box]
+        weight = box_weights.sum()
+        mean = (data[box] * box_weights[:, None]).sum(axis=0) / weight
+        palette.append(tuple(round(value) for value in mean.tolist()))
+        shares.append(float(weight / pixels))
+    return _report(palette, shares, splits)
+
+
+def _color_arrays(colors: list, counts: list) -> tuple:
+    """Unpack `colors` and `counts` into NumPy float arrays."""
+    if isinstance(colors, ColorHistogram):
+        if counts is None:
+            counts = colors.counts
+        packed = np.frombuffer(colors.colors, dtype=np.uint32).astype(np.int64)
+        data = np.stack([packed >> 16, (packed >> 8) & 0xFF, packed & 0xFF], axis=1)
+    else:
+        data = np.array(colors, dtype=np.int64).reshape(-1, 3)
+    data = data.astype(np.float64)
+    if counts is None:
+        weights = np.ones(len(data))
+    else:
+        weights = np.array(counts, dtype=np.float64)
+    if len(weights) != len(data):
+        raise ValueError("Colors and counts must be the same length.")
+    return data, weights
+
+
+def _draw(cumulative: object, rng: object, size: int = None) -> object:
+    """Draw color indices in proportion to their `cumulative` weights."""
+    picks = rng.random(size) * cumulative[-1]
+    return np.minimum(
+        np.searchsorted(cumulative, picks, side="right"), len(cumulative) - 1
+    )
+
+
+def _nearest(data: object, centers: object, chunk: int = 65536) -> object:
+    """Index of the nearest center for every color in `data`."""
+    labels = np.empty(len(data), dtype=np.intp)
+    for start in range(0, len(data), chunk):
+        block = data[start : start + chunk]
+        distances = ((block[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        labels[start : start + chunk] = distances.argmin(axis=1)
+    return labels
+
+
+def kmeans(
+    colors: list,
+    max_colors: int = 8,
+    counts: list = None,
+    seed: int = 0,
+    max_iter: int = 100,
+    time_budget: float = None,
+    batch_size: int = 4096,
+    tol: float = 0.5,
+) -> object:
+    """
+    Extract a palette with k-means clustering over the color histogram.
+
+    Every distinct color is weighted by its pixel count. Histograms with
+    more than `batch_size` colors are clustered with mini-batch k-means,
+    drawing each batch in proportion to the pixel counts, so the time
+    taken doesn't grow with the image size.
+
+    :param colors: list of RGB color tuples or a `ColorHistogram`
+    :param max_colors: maximum number of colors to return
+    :param counts: pixel count of each color (defaults to the histogram
+                   counts or 1 per color)
+    :param seed: random seed, the same seed always gives the same palette
+    :param max_iter: maximum number of refinement passes
+    :param time_budget: stop refining after this many seconds
+    :param batch_size: colors per mini-batch
+    :param tol: stop once no cluster center moves further than this
+    :returns: `ClusterReport` named tuple
+    :exception ImportError: NumPy isn't installed
+    """
+    if np is None:
+        raise ImportError("k-means clustering requires NumPy.")
+    data, weights = _color_arrays(colors, counts)
+    if not len(data):
+        return ClusterReport([], [], 0)
+
+    rng = np.random.default_rng(seed)
+    cumulative = np.cumsum(weights)
+    mini_batch = len(data) > batch_size
+    # weighted k-means++ initialization, on a weighted sample of large histograms
+    if mini_batch:
+        sample = data[_draw(cumulative, rng, batch_size)]
+        sample_weights = np.ones(batch_size)
+    else:
+        sample, sample_weights = data, weights
+    centers = [sample[_draw(np.cumsum(sample_weights), rng)]]
+    nearest = ((sample - centers[0]) ** 2).sum(axis=1)
+    while len(centers) < max_colors:
+        spread = np.cumsum(sample_weights * nearest)
+        if not spread[-1]:
+            break
+        center = sample[_draw(spread, rng)]
+        centers.append(center)
+        nearest = np.minimum(nearest, ((sample - center) ** 2).sum(axis=1))
+    centers = np.array(centers)
+
+    seen = np.zeros(len(centers))
+    start = perf_counter()
+    iterations = 0
+    while iterations < max_iter:
+        if time_budget is not None and perf_counter() - start > time_budget:
+            break
+        iterations += 1
+        if mini_batch:
+            batch = data[_draw(cumulative, rng, batch_size)]
+            batch_weights = np.ones(batch_size)
+        else:
+            batch, batch_weights = data, weights
+        labels = _nearest(batch, centers)
+        mass = np.bincount(labels, batch_weights, len(centers))
+        sums = np.stack(
+            [
+                np.bincount(labels, batch[:, c] * batch_weights, len(centers))
+                for c in range(3)
+            ],
+            axis=1,
+        )
+        if mini_batch:
+            # move each center towards its batch mean with a decaying rate
+            seen += mass
+            rate = np.divide(mass, seen, out=np.zeros_like(mass), where=seen > 0)
+            means = np.divide(
+                sums, mass[:, None], out=centers.copy(), where=mass[:, None] > 0
+            )
+            updated = centers + rate[:, None] * (means - centers)
+        else:
+            updated = np.divide(
+                sums, mass[:, None], out=centers.copy(), where=mass[:, None] > 0
+            )
+        shift = np.abs(updated - centers).max()
+        centers = updated
+        if shift < tol:
+            break
+
+    labels = _nearest(data, centers)
+    coverage = np.bincount(labels, weights, len(centers)) / weights.sum()
+    palette, shares = [], []
+    for center, share in zip(np.rint(centers).astype(int).tolist(), coverage.tolist()):
+        # clusters that lost every color don't cover any pixels
+        if share:
+            palette.append(tuple(center))
+            shares.append(share)
+    return _report(palette, shares, iterations)
+
+
+def cluster(colors: list, max_colors: int = 8, method: str = "kmeans", **options):
+    """
+    Extract a palette with one of the `CLUSTER_METHODS`.
+
+    :param colors: list of RGB color tuples or a `ColorHistogram`
+    :param max_colors: maximum number of colors to return
+    :param method: "kmeans" or "median-cut"
+    :param options: extra options for `kmeans` or `median_cut`
+    :returns: `ClusterReport` named tuple
+    :exception ValueError: unknown cluster method
+    """
+    if method == "kmeans":
+        return kmeans(colors, max_colors, **options)
+    if method == "median-cut":
+        return median_cut(colors, max_colors, **options)
+    raise ValueError(f"Cluster method must be one of {CLUSTER_METHODS}.")
@@ -1,5 +1,35 @@
+from array import array
 from collections import Counter
-from math import sqrt
+from functools import lru_cache
+from math import atan2, cos, degrees, exp, radians, sin, sqrt
+from .histogram import ColorHistogram
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HISTOGRAM_ENGINES = ("numpy", "python")
+DISTANCE_METRICS = ("rgb", "cie76", "ciede2000")
+
+# lookup table of cleaned-up channel values used by `normalize_rgb_values`
+NORMALIZED_VALUES = tuple(0 if v <= 3 else 255 if v >= 253 else v for v in range(256))
+
+# lookup table of sRGB channel values converted to linear light used by `rgb_2_lab`
+LINEAR_VALUES = tuple(
+    v / 255 / 12.92 if v / 255 <= 0.04045 else ((v / 255 + 0.055) / 1.055) ** 2.4
+    for v in range(256)
+)
+
+# default number of cached hex and CMYK conversions, see `set_cache_size`
+COLOR_CACHE_SIZE = 4096
+
+# sRGB (D65) linear RGB to XYZ matrix, rows scaled by the D65 reference white
+XYZ_MATRIX = (
+    (0.4124564 / 0.95047, 0.3575761 / 0.95047, 0.1804375 / 0.95047),
+    (0.2126729, 0.7151522, 0.0721750),
+    (0.0193339 / 1.08883, 0.1191920 / 1.08883, 0.9503041 / 1.08883),
+)
 
 
 def normalize_rgb_values(color: tuple) -> tuple:
@@ -9,7 +39,21 @@ def normalize_rgb_values(color: tuple) -> tuple:
     :param color: a tuple of RGB color values eg. (255, 255, 255)
     :returns: a tuple of RGB color values
     """
-    return tuple([0 if val <= 3 else 255 if val >= 253 else val for val in color])
+    if len(color) != 3:
+        return tuple(NORMALIZED_VALUES[val] for val in color)
+    r, g, b = color
+    return (NORMALIZED_VALUES[r], NORMALIZED_VALUES[g], NORMALIZED_VALUES[b])
+
+
+def normalize_image(image: object) -> object:
+    """
+    Clean-up any slight color differences in PIL sampling for every
+    pixel of an image at once using a lookup table.
+
+    :param image: PIL Image object
+    :returns: PIL Image object
+    """
+    return image.point(list(NORMALIZED_VALUES) * len(image.getbands()))
 
 
 def rgb_2_luma(color: tuple) -> int:
@@ -42,10 +86,17 @@ def rgb_2_hex(color: tuple) -> str:
     """
     Convert RGB color vales to Hex code (eg. #ffffff).
 
+    Conversions are cached (see `cache_stats`) so common colors are
+    only converted once.
+
     :param color: tuple of RGB values for color eg. (255, 255, 255)
     :returns: color Hex code
     """
-    r, g, b = color
+    return _hex(*color)
+
+
+@lru_cache(maxsize=COLOR_CACHE_SIZE)
+def _hex(r: int, g: int, b: int) -> str:
     return f"#{r:02x}{g:02x}{b:02x}"
 
 
@@ -53,15 +104,21 @@ def rgb_2_cmyk(color: tuple) -> tuple:
     """
     Convert RGB color vales to CMYK color values.
 
+    Conversions are cached (see `cache_stats`) so common colors are
+    only converted once.
+
     :param color: tuple of RGB values for color eg. (255, 255, 255)
     :returns: CMYK values eg. (C, M, Y, K)
     """
+    return _cmyk(*color)
+
 
+@lru_cache(maxsize=COLOR_CACHE_SIZE)
+def _cmyk(r: int, g: int, b: int) -> tuple:
     # if RGB color is black return CMYK black
-    if color == (0, 0, 0):
+    if (r, g, b) == (0, 0, 0):
         return (0, 0, 0, 100)
     # convert the RGB values
-    r, g, b = color
     k = 1 - max((r, g, b)) / 255
     c = int(((1 - (r / 255) - k) / (1 - k)) * 100)
     m = int(((1 - (g / 255) - k) / (1 - k)) * 100)
@@ -109,12 +166,365 @@ def color_distance(color1: tuple, color2: tuple) -> int:
     return int(sqrt(((r2 - r1) ** 2) + ((g2 - g1) ** 2) + ((b2 - b1) ** 2)))
 
 
-def get_colors(image: object) -> list:
+def _lab_f(t: float) -> float:
+    return t ** (1 / 3) if t > 216 / 24389 else (24389 / 27 * t + 16) / 116
+
+
+@lru_cache(maxsize=65536)
+def rgb_2_lab(color: tuple) -> tuple:
+    """
+    Convert RGB color values to CIELAB (D65) color values.
+
+    Conversions are cached so each distinct color is only converted once.
+
+    :param color: tuple of RGB values for color eg. (255, 255, 255)
+    :returns: Lab values eg. (100.0, 0.0, 0.0)
+    """
+    rgb = [LINEAR_VALUES[val] for val in color]
+    fx, fy, fz = (_lab_f(sum(m * c for m, c in zip(row, rgb))) for row in XYZ_MATRIX)
+    return (116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz))
+
+
+def lru_stats(func) -> dict:
+    """Hits, misses, maximum and current size of an `lru_cache`."""
+    info = func.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "maxsize": info.maxsize,
+        "size": info.currsize,
+    }
+
+
+def cache_stats() -> dict:
+    """
+    Statistics of the hex, CMYK and Lab conversion caches, use them
+    to check how often common colors are converted again.
+
+    :returns: dict of cache name to hits, misses, maxsize and size
+    """
+    return {
+        "hex": lru_stats(_hex),
+        "cmyk": lru_stats(_cmyk),
+        "lab": lru_stats(rgb_2_lab),
+    }
+
+
+def clear_caches():
+    """Empty the hex, CMYK and Lab conversion caches."""
+    for func in (_hex, _cmyk, rgb_2_lab):
+        func.cache_clear()
+
+
+def set_cache_size(maxsize: int):
+    """
+    Resize (and empty) the hex and CMYK conversion caches.
+
+    :param maxsize: maximum number of cached conversions of each kind
+    """
+    global _hex, _cmyk
+    _hex = lru_cache(maxsize=maxsize)(_hex.__wrapped__)
+    _cmyk = lru_cache(maxsize=maxsize)(_cmyk.__wrapped__)
+
+
+def rgb_2_lab_array(colors: object) -> object:
+    """
+    Convert an array of RGB colors to CIELAB (D65) in one vectorized pass.
+
+    :param colors: NumPy array of RGB colors with shape (n, 3)
+    :returns: NumPy float array of Lab colors with shape (n, 3)
+    """
+    linear = np.array(LINEAR_VALUES)[colors]
+    xyz = linear @ np.array(XYZ_MATRIX).T
+    f = np.where(xyz > 216 / 24389, np.cbrt(xyz), (24389 / 27 * xyz + 16) / 116)
+    return np.stack(
+        [116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])],
+        axis=1,
+    )
+
+
+def delta_e_cie76(lab1: tuple, lab2: tuple) -> float:
+    """
+    Calculate the CIE76 color difference (Euclidean distance in CIELAB).
+
+    :param lab1: tuple of Lab color values
+    :param lab2: tuple of Lab color values
+    :returns: ΔE*ab color difference
+    """
+    l1, a1, b1 = lab1
+    l2, a2, b2 = lab2
+    return sqrt((l2 - l1) ** 2 + (a2 - a1) ** 2 + (b2 - b1) ** 2)
+
+
+def delta_e_ciede2000(lab1: tuple, lab2: tuple) -> float:
+    """
+    Calculate the CIEDE2000 color difference.
+
+    https://en.wikipedia.org/wiki/Color_difference#CIEDE2000
+
+    :param lab1: tuple of Lab color values
+    :param lab2: tuple of Lab color values
+    :returns: ΔE00 color difference
+    """
+    l1, a1, b1 = lab1
+    l2, a2, b2 = lab2
+    c_mean = (sqrt(a1 ** 2 + b1 ** 2) + sqrt(a2 ** 2 + b2 ** 2)) / 2
+    g = 0.5 * (1 - sqrt(c_mean ** 7 / (c_mean ** 7 + 25 ** 7)))
+    a1, a2 = a1 * (1 + g), a2 * (1 + g)
+    c1, c2 = sqrt(a1 ** 2 + b1 ** 2), sqrt(a2 ** 2 + b2 ** 2)
+    h1 = degrees(atan2(b1, a1)) % 360 if c1 else 0.0
+    h2 = degrees(atan2(b2, a2)) % 360 if c2 else 0.0
+
+    dl, dc = l2 - l1, c2 - c1
+    dh = 0.0
+    if c1 and c2:
+        dh = h2 - h1
+        if dh > 180:
+            dh -= 360
+        elif dh < -180:
+            dh += 360
+    dh = 2 * sqrt(c1 * c2) * sin(radians(dh) / 2)
+
+    l_mean, c_mean = (l1 + l2) / 2, (c1 + c2) / 2
+    h_mean = h1 + h2
+    if c1 and c2:
+        if abs(h1 - h2) > 180:
+            h_mean += 360 if h_mean < 360 else -360
+        h_mean /= 2
+    t = (
+        1
+        - 0.17 * cos(radians(h_mean - 30))
+        + 0.24 * cos(radians(2 * h_mean))
+        + 0.32 * cos(radians(3 * h_mean + 6))
+        - 0.20 * cos(radians(4 * h_mean - 63))
+    )
+    sl = 1 + 0.015 * (l_mean - 50) ** 2 / sqrt(20 + (l_mean - 50) ** 2)
+    sc = 1 + 0.045 * c_mean
+    sh = 1 + 0.015 * c_mean * t
+    rt = (
+        -2
+        * sqrt(c_mean ** 7 / (c_mean ** 7 + 25 ** 7))
+        * sin(radians(60 * exp(-(((h_mean - 275) / 25) ** 2))))
+    )
+    return sqrt(
+        (dl / sl) ** 2 + (dc / sc) ** 2 + (dh / sh) ** 2 + rt * (dc / sc) * (dh / sh)
+    )
+
+
+def delta_e_array(labs: object, lab: tuple, metric: str) -> object:
+    """
+    Vectorized `delta_e_cie76` or `delta_e_ciede2000` of many Lab colors
+    against a single Lab color.
+
+    :param labs: NumPy array of Lab colors with shape (n, 3)
+    :param lab: tuple of Lab color values
+    :param metric: "cie76" or "ciede2000"
+    :returns: NumPy float array of color differences
+    """
+    l1, a1, b1 = labs[:, 0], labs[:, 1], labs[:, 2]
+    l2, a2, b2 = lab
+    if metric == "cie76":
+        return np.sqrt((l2 - l1) ** 2 + (a2 - a1) ** 2 + (b2 - b1) ** 2)
+
+    c_mean = (np.sqrt(a1 ** 2 + b1 ** 2) + sqrt(a2 ** 2 + b2 ** 2)) / 2
+    g = 0.5 * (1 - np.sqrt(c_mean ** 7 / (c_mean ** 7 + 25 ** 7)))
+    a1, a2 = a1 * (1 + g), a2 * (1 + g)
+    c1, c2 = np.sqrt(a1 ** 2 + b1 ** 2), np.sqrt(a2 ** 2 + b2 ** 2)
+    h1 = np.where(c1 != 0, np.degrees(np.arctan2(b1, a1)) % 360, 0.0)
+    h2 = np.where(c2 != 0, np.degrees(np.arctan2(b2, a2)) % 360, 0.0)
+    chroma = (c1 != 0) & (c2 != 0)
+
+    dl, dc = l2 - l1, c2 - c1
+    dh = h2 - h1
+    dh = np.where(dh > 180, dh - 360, np.where(dh < -180, dh + 360, dh))
+    dh = np.where(chroma, dh, 0.0)
+    dh = 2 * np.sqrt(c1 * c2) * np.sin(np.radians(dh) / 2)
+
+    l_mean, c_mean = (l1 + l2) / 2, (c1 + c2) / 2
+    h_mean = h1 + h2
+    wrapped = np.abs(h1 - h2) > 180
+    h_mean = np.where(
+        chroma,
+        (h_mean + np.where(wrapped, np.where(h_mean < 360, 360, -360), 0)) / 2,
+        h_mean,
+    )
+    t = (
+        1
+        - 0.17 * np.cos(np.radians(h_mean - 30))
+        + 0.24 * np.cos(np.radians(2 * h_mean))
+        + 0.32 * np.cos(np.radians(3 * h_mean + 6))
+        - 0.20 * np.cos(np.radians(4 * h_mean - 63))
+    )
+    sl = 1 + 0.015 * (l_mean - 50) ** 2 / np.sqrt(20 + (l_mean - 50) ** 2)
+    sc = 1 + 0.045 * c_mean
+    sh = 1 + 0.015 * c_mean * t
+    rt = (
+        -2
+        * np.sqrt(c_mean ** 7 / (c_mean ** 7 + 25 ** 7))
+        * np.sin(np.radians(60 * np.exp(-(((h_mean - 275) / 25) ** 2))))
+    )
+    return np.sqrt(
+        (dl / sl) ** 2 + (dc / sc) ** 2 + (dh / sh) ** 2 + rt * (dc / sc) * (dh / sh)
+    )
+
+
+def histogram_engine(engine: str = None) -> str:
+    """
+    Check a histogram engine is available, picking the default if None.
+
+    The "numpy" engine is used by default when NumPy is installed,
+    otherwise the pure-Python "python" engine is used.
+
+    :param engine: histogram engine ("numpy", "python" or None)
+    :returns: histogram engine name
+    :exception ValueError: unknown histogram engine
+    :exception ImportError: "numpy" engine requested but NumPy isn't installed
+    """
+    if engine is None:
+        return "numpy" if np is not None else "python"
+    if engine not in HISTOGRAM_ENGINES:
+        raise ValueError(f"Histogram engine must be one of {HISTOGRAM_ENGINES}.")
+    if engine == "numpy" and np is None:
+        raise ImportError("The 'numpy' histogram engine requires NumPy.")
+    return engine
+
+
+def get_histogram(
+    image: object, engine: str = None, normalize: bool = True
+) -> ColorHistogram:
+    """
+    Count all pixels from an image into a compact `ColorHistogram`
+    sorted by most common.
+
+    The "numpy" engine is used by default when NumPy is installed,
+    otherwise the pure-Python "python" engine is used.
+
+    Pixels are normalized before counting so near-black and near-white
+    variants are counted as pure black and white.
+
+    :param image: PIL Image object (converted to RGB if needed)
+    :param engine: histogram engine to use ("numpy" or "python")
+    :param normalize: normalize every pixel before counting
+    :returns: `ColorHistogram` object
+    :exception ValueError: unknown histogram engine
+    :exception ImportError: "numpy" engine requested but NumPy isn't installed
+    """
+    engine = histogram_engine(engine)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return count_strips([image], engine, normalize)
+
+
+def _count_strips_python(strips) -> ColorHistogram:
+    """Count the pixels of many RGB images using a single `Counter`."""
+    counter = Counter()
+    for strip in strips:
+        counter.update(strip.getdata())
+    colors = counter.most_common()
+    return ColorHistogram(
+        array("I", [(r << 16) | (g << 8) | b for ((r, g, b), _) in colors]),
+        array("I", [count for (_, count) in colors]),
+    )
+
+
+def _count_strips_numpy(strips) -> ColorHistogram:
+    """
+    Count the pixels of many RGB images by packing each pixel into a
+    24-bit integer straight from the raw image buffer and merging the
+    unique colors of each image into running totals.
+
+    The position each color is first seen is carried along so colors
+    with the same count keep the order they first appear in, matching
+    `Counter.most_common()`.
+    """
+    values = np.empty(0, dtype=np.uint32)
+    counts = np.empty(0, dtype=np.int64)
+    first = np.empty(0, dtype=np.int64)
+    offset = 0
+    for strip in strips:
+        data = np.frombuffer(strip.tobytes(), dtype=np.uint8).reshape(-1, 3)
+        packed = (
+            (data[:, 0].astype(np.uint32) << 16)
+            | (data[:, 1].astype(np.uint32) << 8)
+            | data[:, 2]
+        )
+        strip_values, strip_first, strip_counts = np.unique(
+            packed, return_index=True, return_counts=True
+        )
+        if not len(values):
+            # nothing to merge with (always the case for a single image)
+            values = strip_values
+            counts = strip_counts.astype(np.int64)
+            first = strip_first.astype(np.int64) + offset
+            offset += len(packed)
+            continue
+        values, inverse = np.unique(
+            np.concatenate((values, strip_values)), return_inverse=True
+        )
+        merged_counts = np.bincount(
+            inverse, np.concatenate((counts, strip_counts)), len(values)
+        ).astype(np.int64)
+        # colors seen in earlier strips keep their earlier position
+        merged_first = np.empty(len(values), dtype=np.int64)
+        merged_first[inverse[len(first) :]] = strip_first + offset
+        merged_first[inverse[: len(first)]] = first
+        counts, first = merged_counts, merged_first
+        offset += len(packed)
+    order = np.lexsort((first, -counts))
+    colors, color_counts = array("I"), array("I")
+    colors.frombytes(values[order].astype(np.uint32).tobytes())
+    color_counts.frombytes(counts[order].astype(np.uint32).tobytes())
+    return ColorHistogram(colors, color_counts)
+
+
+def count_strips(strips, engine: str = None, normalize: bool = True) -> ColorHistogram:
+    """
+    Count the pixels of many RGB images (eg. strips of one large image)
+    into a single `ColorHistogram` sorted by most common, as if they
+    were one image.
+
+    :param strips: iterable of RGB PIL Image objects
+    :param engine: histogram engine to use ("numpy" or "python")
+    :param normalize: normalize every pixel before counting
+    :returns: `ColorHistogram` object
+    :exception ValueError: unknown histogram engine
+    :exception ImportError: "numpy" engine requested but NumPy isn't installed
+    """
+    engine = histogram_engine(engine)
+    if normalize:
+        strips = map(normalize_image, strips)
+    if engine == "numpy":
+        histogram = _count_strips_numpy(strips)
+    else:
+        histogram = _count_strips_python(strips)
+    histogram.normalized = normalize
+    return histogram
+
+
+def get_color_counts(
+    image: object, engine: str = None, normalize: bool = True
+) -> tuple:
+    """
+    Count all pixels from an image and sort their RGB values by most common.
+
+    :param image: PIL Image object
+    :param engine: histogram engine to use ("numpy" or "python")
+    :param normalize: normalize every pixel before counting
+    :returns: tuple of (list of RGB tuples, list of pixel counts)
+    """
+    histogram = get_histogram(image, engine, normalize)
+    return histogram.tolist(), histogram.counts.tolist()
+
+
+def get_colors(
+    image: object, engine: str = None, normalize: bool = True
+) -> ColorHistogram:
     """
     Sample all pixels from an image and sort their RGB values by most common
 
     :param image: PIL Image object
-    :returns: list of RGB tuples (255, 255, 255)
+    :param engine: histogram engine to use ("numpy" or "python")
+    :param normalize: normalize every pixel before counting
+    :returns: `ColorHistogram`, iterates RGB tuples (255, 255, 255)
     """
-    colors = Counter([pixel for pixel in image.getdata()])
-    return [color for (color, _) in colors.most_common()]
+    return get_histogram(image, engine, normalize)
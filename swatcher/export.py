@@ -1,8 +1,41 @@
+import mmap
 import os
 import tempfile
 import struct
 
-from .color import rgb_2_hex
+from collections import namedtuple
+from functools import lru_cache
+from .color import lru_stats, rgb_2_hex
+
+# file header: signature, major and minor version, number of blocks
+ASE_HEADER = struct.Struct(">4sHHI")
+# color block: block type, block length, name length, UTF-16BE "#rrggbb\0"
+# name, color mode, RGB values (0-1) and color type (2 == Process)
+ASE_SWATCH = struct.Struct(">HIH16s4s3fh")
+ASE_COLOR_BLOCK = 0x0001
+ASE_PROCESS = 2
+# color group blocks, an end block is just the block type and a zero length
+ASE_GROUP_START = 0xC001
+ASE_GROUP_END = 0xC002
+ASE_GROUP_END_CHUNK = struct.pack(">HI", ASE_GROUP_END, 0)
+# default number of cached encoded color blocks, see `set_cache_size`
+SWATCH_CACHE_SIZE = 4096
+# block type and length at the start of every block
+ASE_BLOCK = struct.Struct(">HI")
+# number of values of each color mode and the color type names
+ASE_MODES = {"RGB": 3, "CMYK": 4, "LAB": 3, "Gray": 1}
+ASE_TYPES = ("Global", "Spot", "Process")
+
+Swatch = namedtuple("Swatch", ["name", "mode", "values", "type", "group"])
+Swatch.__doc__ = """
+Color swatch read from an Adobe ASE file.
+
+name: swatch name
+mode: color mode ("RGB", "CMYK", "LAB" or "Gray")
+values: color values eg. (1.0, 1.0, 1.0) for RGB white
+type: color type ("Global", "Spot" or "Process")
+group: name of the color group the swatch is in (or None)
+"""
 
 
 def format_ase_swatch(color: tuple) -> dict:
@@ -46,19 +79,25 @@ def color_byte_chunk(color: dict) -> bytes:
 
     credit: https://github.com/nsfmc/swatch
 
+    Chunks are cached (see `cache_stats`) so common colors are only
+    encoded once.
+
     :returns: byte-chunk for a color
     """
-    title = color["name"] + "\0"
+    data = color["data"]
+    return _color_byte_chunk(color["name"], data["mode"], tuple(data["values"]))
+
+
+@lru_cache(maxsize=SWATCH_CACHE_SIZE)
+def _color_byte_chunk(name: str, mode: str, values: tuple) -> bytes:
+    title = name + "\0"
     title_length = len(title)
     # Big-Endian Unsigned Short == len(color_name)
     chunk = struct.pack(">H", title_length)
     # UTF-16BE Encoded color_name terminated with '\0'
     chunk += title.encode("utf-16be")
-    # grab the color information
-    mode = color["data"]["mode"].encode()
-    values = color["data"]["values"]
     # encode the color mode
-    padded_mode = mode.decode().ljust(4).encode()
+    padded_mode = mode.ljust(4).encode()
     # the color mode
     chunk += struct.pack("!4s", padded_mode)
     # the color values
@@ -87,6 +126,218 @@ def colors_to_bytes(colors: list) -> bytes:
     return head + body
 
 
+def encode_ase(colors: list) -> bytearray:
+    """
+    Encode a complete Adobe ASE file of RGB color swatches named by
+    their Hex code, packed straight into one preallocated buffer.
+
+    Gives the same bytes as `colors_to_bytes(create_ase_swatches(colors))`
+    without building a swatch dictionary and byte-chunk for every color.
+
+    :param colors: a list of RGB color tuples (or lists)
+    :returns: encoded Adobe ASE file bytes
+    """
+    colors = list(colors)
+    buffer = bytearray(ASE_HEADER.size + ASE_SWATCH.size * len(colors))
+    ASE_HEADER.pack_into(buffer, 0, b"ASEF", 1, 0, len(colors))
+    pack_swatches(buffer, ASE_HEADER.size, colors)
+    return buffer
+
+
+def pack_swatches(buffer: bytearray, offset: int, colors: list):
+    """
+    Pack ASE color blocks for `colors` into `buffer` starting at `offset`.
+
+    Encoded blocks are cached (see `cache_stats`) so common colors are
+    only encoded once. Palettes with more colors than the cache holds
+    skip it, they would only evict each other's blocks.
+
+    :param buffer: writable buffer with `ASE_SWATCH.size` bytes per color
+    :param offset: position of the first color block in `buffer`
+    :param colors: a list of RGB color tuples (or lists)
+    """
+    size = ASE_SWATCH.size
+    swatch_block = _swatch_block
+    maxsize = swatch_block.cache_info().maxsize
+    if maxsize is not None and len(colors) > maxsize:
+        # palettes larger than the cache would only churn it, encoding
+        # every block is faster than the cache misses and evictions
+        swatch_block = swatch_block.__wrapped__
+    for color in colors:
+        buffer[offset : offset + size] = swatch_block(*color)
+        offset += size
+
+
+@lru_cache(maxsize=SWATCH_CACHE_SIZE)
+def _swatch_block(r: int, g: int, b: int) -> bytes:
+    """Encoded ASE color block of a RGB color named by its Hex code."""
+    name = (rgb_2_hex((r, g, b)) + "\0").encode("utf-16be")
+    # the block length doesn't include the block type and length fields
+    return ASE_SWATCH.pack(
+        ASE_COLOR_BLOCK,
+        ASE_SWATCH.size - 6,
+        len(name) // 2,
+        name,
+        b"RGB ",
+        r / 255,
+        g / 255,
+        b / 255,
+        ASE_PROCESS,
+    )
+
+
+def cache_stats() -> dict:
+    """
+    Statistics of the encoded color block caches, use them to pick a
+    `set_cache_size` for your workload.
+
+    :returns: dict of cache name to hits, misses, maxsize and size
+    """
+    return {
+        "swatch": lru_stats(_swatch_block),
+        "chunk": lru_stats(_color_byte_chunk),
+    }
+
+
+def clear_caches():
+    """Empty the encoded color block caches."""
+    _swatch_block.cache_clear()
+    _color_byte_chunk.cache_clear()
+
+
+def set_cache_size(maxsize: int):
+    """
+    Resize (and empty) the encoded color block caches.
+
+    :param maxsize: maximum number of cached color blocks of each kind
+    """
+    global _swatch_block, _color_byte_chunk
+    _swatch_block = lru_cache(maxsize=maxsize)(_swatch_block.__wrapped__)
+    _color_byte_chunk = lru_cache(maxsize=maxsize)(_color_byte_chunk.__wrapped__)
+
+
+def group_start_chunk(name: str) -> bytes:
+    """
+    Build the byte-chunk starting an Adobe ASE color group.
+
+    :param name: color group name
+    :returns: byte-chunk for a group start block
+    """
+    title = (name + "\0").encode("utf-16be")
+    # name length in UTF-16 code units (including the terminating '\0')
+    chunk = struct.pack(">H", len(title) // 2) + title
+    return struct.pack(">HI", ASE_GROUP_START, len(chunk)) + chunk
+
+
+class ASEWriter:
+    """
+    Stream many palettes into a single Adobe ASE file, one color group
+    per palette, writing each group as it's added so memory use doesn't
+    grow with the number of palettes.
+
+    The ASE header holds the total number of blocks. Seekable streams
+    get the count patched in when the writer is closed, for other
+    streams (eg. sockets) pass the number of `blocks` up front, which
+    is the number of colors plus 2 per palette.
+
+    with open("catalog.ase", "wb") as file, ASEWriter(file) as writer:
+        writer.write_palette(colors, "image.jpg")
+    """
+
+    def __init__(self, stream: object, blocks: int = None):
+        """
+        Initialize an ASE writer and write the file header.
+
+        :param stream: writable binary stream
+        :param blocks: total number of blocks that will be written,
+                       required for streams that can't seek
+        :exception ValueError: `blocks` is missing for a non-seekable stream
+        """
+        seekable = getattr(stream, "seekable", None)
+        self._seekable = bool(seekable and seekable())
+        if not self._seekable and blocks is None:
+            raise ValueError("Non-seekable streams need the number of blocks.")
+        self.stream = stream
+        self.blocks = 0
+        self._expected = blocks
+        self._start = stream.tell() if self._seekable else None
+        self._closed = False
+        stream.write(ASE_HEADER.pack(b"ASEF", 1, 0, blocks or 0))
+
+    def write_palette(self, colors: list, name: str = None) -> int:
+        """
+        Write a palette, as a color group when `name` is given.
+
+        :param colors: a list of RGB color tuples (or lists)
+        :param name: color group name eg. the source image file name
+        :returns: number of bytes written
+        """
+        colors = list(colors)
+        start = group_start_chunk(name) if name is not None else b""
+        end = ASE_GROUP_END_CHUNK if name is not None else b""
+        buffer = bytearray(len(start) + ASE_SWATCH.size * len(colors) + len(end))
+        buffer[: len(start)] = start
+        pack_swatches(buffer, len(start), colors)
+        buffer[len(buffer) - len(end) :] = end
+        self.stream.write(buffer)
+        self.blocks += len(colors) + (2 if name is not None else 0)
+        return len(buffer)
+
+    def close(self):
+        """
+        Finish the file, patching the number of blocks into the header.
+
+        :exception ValueError: a non-seekable stream got a different
+                               number of blocks than promised
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._seekable:
+            end = self.stream.tell()
+            self.stream.seek(self._start + 8)
+            self.stream.write(struct.pack(">I", self.blocks))
+            self.stream.seek(end)
+        elif self.blocks != self._expected:
+            raise ValueError(
+                f"Wrote {self.blocks} blocks but the header says {self._expected}."
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def group_palette(item: object) -> tuple:
+    """
+    Get the group name and colors of a Swatcher object or a
+    (name, colors) tuple.
+
+    :param item: Swatcher object or (name, colors) tuple
+    :returns: (group name, list of RGB color tuples)
+    """
+    if hasattr(item, "palette") and hasattr(item, "path"):
+        return os.path.basename(item.path), item.palette
+    name, colors = item
+    return name, colors
+
+
+def write_ase(colors: list, stream: object) -> int:
+    """
+    Write an encoded Adobe ASE file straight to a writable binary
+    stream eg. an open file, `BytesIO`, socket file or HTTP response.
+
+    :param colors: a list of RGB color tuples (or lists)
+    :param stream: writable binary stream
+    :returns: number of bytes written
+    """
+    data = encode_ase(colors)
+    stream.write(data)
+    return len(data)
+
+
 def write_ase_file(colors: list) -> object:
     """
     Writes an encoded Adobe ASE file to temporary file object.
@@ -94,9 +345,8 @@ def write_ase_file(colors: list) -> object:
     :param colors: a list of RGB color tuples (or lists)
     :returns: temporary file object
     """
-    swatches = create_ase_swatches(colors)
     file = tempfile.TemporaryFile()
-    file.write(colors_to_bytes(swatches))
+    write_ase(colors, file)
     file.seek(0)
     return file
 
@@ -112,18 +362,17 @@ def check_path_type(path):
 
 def export_ase_file(colors: list, path: str) -> str:
     """
-    Export an encoded Adobe ASE temp file to filesystem.
+    Export an encoded Adobe ASE file to filesystem.
 
     :param colors: a list of RGB color tuples (or lists)
     :param `path`: a filename string
     :returns: export location in filesystem
     :exception OSError: swatches could not be exported
     """
-    temp_file = write_ase_file(colors)
     fp = check_path_type(path) + ".ase"
     try:
         with open(fp, "wb") as file:
-            file.write(temp_file.read())
+            write_ase(colors, file)
     except OSError as e:
         raise OSError(f"Swatches could not be exported to {path}.") from e
     return fp
@@ -140,3 +389,158 @@ def export_image_file(image: object, path: str) -> str:
     fp = check_path_type(path) + ".png"
     image.save(fp, "PNG")
     return fp
+
+
+def export_ase_groups(palettes: list, path: str) -> str:
+    """
+    Export many palettes to a single Adobe ASE file on the filesystem,
+    one color group per palette.
+
+    Palettes are written as they are read from `palettes`, so a
+    generator of Swatcher objects is processed one image at a time.
+
+    :param palettes: Swatcher objects (grouped by image file name) or
+                     (group name, colors) tuples
+    :param `path`: a filename string
+    :returns: export location in filesystem
+    :exception OSError: swatches could not be exported
+    """
+    fp = check_path_type(path) + ".ase"
+    try:
+        with open(fp, "wb") as file, ASEWriter(file) as writer:
+            for item in palettes:
+                name, colors = group_palette(item)
+                writer.write_palette(colors, name)
+    except OSError as e:
+        raise OSError(f"Swatches could not be exported to {path}.") from e
+    return fp
+
+
+def iter_ase(data) -> object:
+    """
+    Iterate the swatches of an encoded Adobe ASE file.
+
+    Blocks are decoded in place with `struct.unpack_from` on a
+    `memoryview` of `data`, so nothing is copied and a memory-mapped
+    file is only read as the swatches are used.
+
+    :param data: bytes-like object eg. `bytes` or an `mmap`
+    :returns: generator of `Swatch` named tuples
+    :exception ValueError: the data isn't a valid Adobe ASE file
+    """
+    view = memoryview(data)
+    try:
+        signature, major, _, _ = ASE_HEADER.unpack_from(view)
+    except struct.error as e:
+        raise ValueError("Data is not an Adobe ASE file.") from e
+    if signature != b"ASEF" or major != 1:
+        raise ValueError("Data is not an Adobe ASE file.")
+    offset, end = ASE_HEADER.size, len(view)
+    standard = ASE_SWATCH.size - ASE_BLOCK.size
+    group = None
+    while offset < end:
+        try:
+            block_type, length = ASE_BLOCK.unpack_from(view, offset)
+        except struct.error as e:
+            raise ValueError("Adobe ASE file is truncated.") from e
+        start = offset + ASE_BLOCK.size
+        offset = start + length
+        if offset > end:
+            raise ValueError("Adobe ASE file is truncated.")
+        if block_type == ASE_GROUP_END:
+            group = None
+        elif block_type == ASE_GROUP_START:
+            group = _read_ase_name(view, start)[0]
+        elif block_type == ASE_COLOR_BLOCK:
+            if length == standard:
+                # fast path for the RGB blocks `encode_ase` writes
+                (
+                    _,
+                    _,
+                    name_length,
+                    name,
+                    mode,
+                    r,
+                    g,
+                    b,
+                    color_type,
+                ) = ASE_SWATCH.unpack_from(view, start - ASE_BLOCK.size)
+                if name_length == 8 and mode == b"RGB " and 0 <= color_type <= 2:
+                    name = name[:-2].decode("utf-16be")
+                    yield Swatch(name, "RGB", (r, g, b), ASE_TYPES[color_type], group)
+                    continue
+            yield _read_ase_swatch(view, start, group)
+
+
+def _read_ase_name(view: memoryview, offset: int) -> tuple:
+    """Decode a block name, returns the name and the offset after it."""
+    # UTF-16BE name terminated with '\0', length in code units
+    try:
+        (length,) = struct.unpack_from(">H", view, offset)
+        end = offset + 2 + length * 2
+        if end > len(view):
+            raise ValueError("Adobe ASE file is truncated.")
+        return str(view[offset + 2 : end - 2], "utf-16be"), end
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ValueError("Adobe ASE block name is invalid.") from e
+
+
+def _read_ase_swatch(view: memoryview, offset: int, group: str) -> Swatch:
+    """Decode the color block starting at `offset`."""
+    name, offset = _read_ase_name(view, offset)
+    try:
+        mode = str(view[offset : offset + 4], "ascii").strip()
+        count = ASE_MODES[mode]
+        values = struct.unpack_from(f">{count}f", view, offset + 4)
+        (color_type,) = struct.unpack_from(">h", view, offset + 4 + count * 4)
+        return Swatch(name, mode, values, ASE_TYPES[color_type], group)
+    except (KeyError, IndexError, UnicodeDecodeError, struct.error) as e:
+        raise ValueError(f"Adobe ASE swatch {name!r} is invalid.") from e
+
+
+def read_ase(file) -> object:
+    """
+    Iterate the swatches of an Adobe ASE file on the filesystem or in
+    an open file object, memory-mapping it when possible so even huge
+    files are streamed instead of read up front.
+
+    :param file: a filename (string) or file object in binary mode
+    :returns: generator of `Swatch` named tuples
+    :exception ValueError: the file isn't a valid Adobe ASE file
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            yield from read_ase(f)
+        return
+    try:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError):
+        # in-memory files (and empty files) can't be mapped
+        data = file.read()
+    yield from iter_ase(data)
+
+
+def read_ase_palettes(file) -> list:
+    """
+    Read the RGB palettes of an Adobe ASE file, one per color group.
+
+    Files written by `export_ase_file` or `export_ase_groups` read
+    back to the exact colors they were written with. Swatches in other
+    color modes and empty groups are skipped, and consecutive groups
+    with the same name are read as one palette.
+
+    :param file: a filename (string) or file object in binary mode
+    :returns: list of (group name, list of RGB color tuples) tuples, the
+              group name is None for swatches outside of a group
+    :exception ValueError: the file isn't a valid Adobe ASE file
+    """
+    palettes = []
+    current = None
+    for swatch in read_ase(file):
+        if swatch.mode != "RGB":
+            continue
+        if current is None or current[0] != swatch.group:
+            current = (swatch.group, [])
+            palettes.append(current)
+        current[1].append(tuple(round(value * 255) for value in swatch.values))
+    return palettes
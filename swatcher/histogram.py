@@ -0,0 +1,234 @@
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from array import array
+
+# binary header: magic, format version, flags, number of colors
+HEADER = struct.Struct("<4sHHI")
+MAGIC = b"SWCH"
+VERSION = 2
+# colors were cleaned-up with `color.normalize_image` before counting
+FLAG_NORMALIZED = 1
+
+
+def pack_rgb(color: tuple) -> int:
+    """
+    Pack RGB color values into a single 24-bit integer (0xRRGGBB).
+
+    :param color: a tuple of RGB color values eg. (255, 255, 255)
+    :returns: packed color
+    """
+    r, g, b = color
+    return (r << 16) | (g << 8) | b
+
+
+def unpack_rgb(value: int) -> tuple:
+    """
+    Unpack a 24-bit integer (0xRRGGBB) into RGB color values.
+
+    :param value: packed color
+    :returns: a tuple of RGB color values eg. (255, 255, 255)
+    """
+    return (value >> 16, (value >> 8) & 0xFF, value & 0xFF)
+
+
+class ColorHistogram:
+    """
+    Compact color histogram sorted by most common color.
+
+    Colors are packed into 24-bit integers stored in an `array("I")`
+    with a parallel array of pixel counts, about 8 bytes per color
+    instead of ~100 for a list of tuples. Iterating yields RGB tuples
+    so it works anywhere a list of color tuples did.
+
+    `normalized` histograms were counted from normalized pixels, so
+    sampling can use their colors as-is.
+    """
+
+    def __init__(self, colors=None, counts=None, normalized: bool = False):
+        """
+        Initialize a color histogram.
+
+        :param colors: packed colors (any sequence of uint32 eg. `array("I")`)
+        :param counts: pixel count of each color (defaults to all 1)
+        :param normalized: colors are already normalized
+        """
+        self.colors = colors if colors is not None else array("I")
+        if counts is None:
+            counts = array("I", [1]) * len(self.colors)
+        if len(counts) != len(self.colors):
+            raise ValueError("Colors and counts must be the same length.")
+        self.counts = counts
+        self.normalized = normalized
+
+    @classmethod
+    def from_colors(cls, colors: list, counts: list = None) -> "ColorHistogram":
+        """
+        Create a color histogram from RGB color tuples.
+
+        :param colors: list of RGB color tuples sorted by most common
+        :param counts: pixel count of each color in `colors`
+        :returns: `ColorHistogram` object
+        """
+        packed = array("I", [pack_rgb(color) for color in colors])
+        return cls(packed, array("I", counts) if counts is not None else None)
+
+    def tolist(self) -> list:
+        """List of RGB color tuples."""
+        return list(self)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the packed colors and counts in bytes."""
+        return sum(
+            len(values) * getattr(values, "itemsize", 4)
+            for values in (self.colors, self.counts)
+        )
+
+    def to_bytes(self) -> bytes:
+        """
+        Pack the histogram into a compact binary format.
+
+        A small header (including the `normalized` flag) is followed
+        by every color as a little-endian
+        uint32 (0xRRGGBB) and then every pixel count as a uint32.
+
+        :returns: packed histogram bytes
+        """
+        values = [self.colors, self.counts]
+        for i, packed in enumerate(values):
+            # uint32 arrays and mapped histograms are written as they are
+            if sys.byteorder != "little" or getattr(packed, "itemsize", 0) != 4:
+                values[i] = packed = array("I", packed)
+            if sys.byteorder != "little":
+                packed.byteswap()
+        flags = FLAG_NORMALIZED if self.normalized else 0
+        header = HEADER.pack(MAGIC, VERSION, flags, len(self.colors))
+        return header + b"".join(packed.tobytes() for packed in values)
+
+    @staticmethod
+    def _unpack_header(data) -> tuple:
+        """Check a packed histogram header, returns its flags and offsets."""
+        try:
+            magic, version, flags, length = HEADER.unpack_from(data)
+        except struct.error as e:
+            raise ValueError("Data is not a packed Swatcher histogram.") from e
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Data is not a packed Swatcher histogram.")
+        start = HEADER.size
+        middle = start + length * 4
+        end = middle + length * 4
+        if len(data) < end:
+            raise ValueError("Packed Swatcher histogram is truncated.")
+        return flags, start, middle, end
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ColorHistogram":
+        """
+        Unpack a histogram packed with `ColorHistogram.to_bytes`.
+
+        :param data: packed histogram bytes
+        :returns: `ColorHistogram` object
+        :exception ValueError: the data isn't a packed histogram
+        """
+        flags, start, middle, end = cls._unpack_header(data)
+        colors, counts = array("I"), array("I")
+        colors.frombytes(data[start:middle])
+        counts.frombytes(data[middle:end])
+        if sys.byteorder != "little":
+            colors.byteswap()
+            counts.byteswap()
+        return cls(colors, counts, bool(flags & FLAG_NORMALIZED))
+
+    @classmethod
+    def from_buffer(cls, data) -> "ColorHistogram":
+        """
+        Read a histogram packed with `ColorHistogram.to_bytes` straight
+        from a buffer (eg. an `mmap`) without copying the colors or counts.
+
+        The histogram stays backed by `data`, so it must not change
+        while the histogram is in use. Big-endian machines can't read
+        the little-endian layout in place and get a copy instead.
+
+        :param data: bytes-like object of a packed histogram
+        :returns: `ColorHistogram` object
+        :exception ValueError: the data isn't a packed histogram
+        """
+        if sys.byteorder != "little":
+            return cls.from_bytes(data)
+        flags, start, middle, end = cls._unpack_header(data)
+        view = memoryview(data)
+        colors = view[start:middle].cast("I")
+        counts = view[middle:end].cast("I")
+        return cls(colors, counts, bool(flags & FLAG_NORMALIZED))
+
+    def save(self, path: str):
+        """
+        Save the histogram in the binary format of `to_bytes`, so any
+        process can open it with `open_histogram`.
+
+        The file is replaced atomically, processes that already opened
+        the previous histogram keep reading it unchanged.
+
+        :param path: file path to save the histogram to
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(self.to_bytes())
+            os.replace(temp, path)
+        except BaseException:
+            os.remove(temp)
+            raise
+
+    def __len__(self):
+        return len(self.colors)
+
+    def __iter__(self):
+        for value in self.colors:
+            yield (value >> 16, (value >> 8) & 0xFF, value & 0xFF)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return ColorHistogram(self.colors[key], self.counts[key], self.normalized)
+        return unpack_rgb(self.colors[key])
+
+    def __eq__(self, other):
+        if isinstance(other, ColorHistogram):
+            return list(self.colors) == list(other.colors) and list(
+                self.counts
+            ) == list(other.counts)
+        if isinstance(other, (list, tuple)):
+            return self.tolist() == [tuple(color) for color in other]
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"ColorHistogram({len(self)} colors, {self.nbytes} bytes)"
+
+
+def open_histogram(path: str) -> ColorHistogram:
+    """
+    Open a histogram saved with `ColorHistogram.save` as a read-only
+    memory map.
+
+    Nothing is read or copied up front, the operating system pages in
+    the colors as they are used and every process that opens the same
+    file shares the same memory.
+
+    :param path: histogram file path
+    :returns: `ColorHistogram` object backed by the mapped file
+    :exception ValueError: the file isn't a packed histogram
+    """
+    with open(path, "rb") as file:
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            # empty files can't be mapped
+            raise ValueError("Data is not a packed Swatcher histogram.") from e
+    return ColorHistogram.from_buffer(data)
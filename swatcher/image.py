@@ -1,64 +1,529 @@
+from array import array
 from collections import Counter
-from PIL import Image, ImageChops
-from .color import normalize_rgb_values
+from math import ceil, floor
+from PIL import Image
+from .color import count_strips, normalize_rgb_values
 
+# Pillow 9.1+ moved the quantize methods into the `Image.Quantize` enum
+_Quantize = getattr(Image, "Quantize", Image)
+QUANTIZE_METHODS = {"median-cut": _Quantize.MEDIANCUT, "octree": _Quantize.FASTOCTREE}
 
-def trim_excess(image: object) -> object:
+
+def background_pixel(corners: list) -> tuple:
+    """
+    Pick the background color of an image from its corner pixels.
+
+    :param corners: RGB color tuples of the image corners
+    :returns: most common normalized corner color or None if there's a tie
+    """
+    # count how many times each value is present
+    color_count = Counter([normalize_rgb_values(pixel) for pixel in corners])
+    color_count = color_count.most_common()
+
+    # if multiple corners have the same pixel count don't trim
+    if len(color_count) > 1 and color_count[0][1] == color_count[1][1]:
+        return None
+    # set the comparison pixel to the most common value
+    return color_count[0][0]
+
+
+def background_table(bg_pixel: tuple) -> list:
+    """
+    Point table mapping the background color to black and every other
+    value to white, so `getbbox` finds the content of an image.
+
+    :param bg_pixel: background RGB color tuple
+    :returns: `Image.point` lookup table
+    """
+    table = []
+    for value in bg_pixel:
+        table.extend(0 if v == value else 255 for v in range(256))
+    return table
+
+
+def _edge_offset(image: object, table: list, edge: str, box: tuple) -> int:
+    """
+    Count the background lines from one edge of `box` inward.
+
+    Lines are checked in blocks that double in size (up to 256 lines)
+    so only the border region is touched, stopping at the first block
+    with any content.
+    """
+    left, top, right, bottom = box
+    length = bottom - top if edge in ("top", "bottom") else right - left
+
+    def region(start, stop):
+        if edge == "top":
+            return (left, top + start, right, top + stop)
+        if edge == "bottom":
+            return (left, bottom - stop, right, bottom - start)
+        if edge == "left":
+            return (left + start, top, left + stop, bottom)
+        return (right - stop, top, right - start, bottom)
+
+    start, block = 0, 8
+    while start < length:
+        stop = min(start + block, length)
+        found = image.crop(region(start, stop)).point(table).getbbox()
+        if found is not None:
+            if edge == "top":
+                return start + found[1]
+            if edge == "bottom":
+                return start + (stop - start) - found[3]
+            if edge == "left":
+                return start + found[0]
+            return start + (stop - start) - found[2]
+        start, block = stop, min(block * 2, 256)
+    return length
+
+
+def content_bbox(image: object, bg_pixel: tuple, box: tuple = None) -> tuple:
+    """
+    Find the bounding box of every pixel that isn't the background color
+    by walking inward from each edge, stopping at the first content line.
+
+    :param image: RGB PIL Image object
+    :param bg_pixel: background RGB color tuple
+    :param box: (left, top, right, bottom) region to search, defaults to all
+    :returns: (left, top, right, bottom) box or None if it's all background
+    """
+    table = background_table(bg_pixel)
+    left, top, right, bottom = box or (0, 0) + image.size
+    top += _edge_offset(image, table, "top", (left, top, right, bottom))
+    if top == bottom:
+        return None
+    bottom -= _edge_offset(image, table, "bottom", (left, top, right, bottom))
+    left += _edge_offset(image, table, "left", (left, top, right, bottom))
+    right -= _edge_offset(image, table, "right", (left, top, right, bottom))
+    return (left, top, right, bottom)
+
+
+def trim_excess(image: object, proxy_size: int = None) -> object:
     """
     Trim excess background pixels from around an image.
 
     :param image: PIL Image object
+    :param proxy_size: find the content on a nearest neighbor copy no
+                       larger than `proxy_size` first and only search the
+                       matching region (plus a proxy pixel) of `image`,
+                       faster on large images but content thinner than a
+                       proxy pixel near the edges can be trimmed away
     :returns: PIL Image object
     """
     w, h = image.size
 
     # get RGB value for each corner of image
     corners = [
-        normalize_rgb_values(image.getpixel((0, 0))),
-        normalize_rgb_values(image.getpixel((w - 1, 0))),
-        normalize_rgb_values(image.getpixel((0, h - 1))),
-        normalize_rgb_values(image.getpixel((w - 1, h - 1))),
+        image.getpixel((0, 0)),
+        image.getpixel((w - 1, 0)),
+        image.getpixel((0, h - 1)),
+        image.getpixel((w - 1, h - 1)),
     ]
-    # count how many times each value is present
-    color_count = Counter([pixel for pixel in corners]).most_common()
-
-    # if multiple corners have the same pixel count don't trim
-    if len(color_count) > 1 and color_count[0][1] == color_count[1][1]:
+    bg_pixel = background_pixel(corners)
+    if bg_pixel is None:
         return image
-    else:  # set the comparison pixel to the most common value
-        bg_pixel = color_count[0][0]
 
-    # compare the original image to the excess pixels
-    comp = Image.new("RGB", image.size, bg_pixel)
-    diff = ImageChops.difference(image, comp)
-    bbox = diff.getbbox()
+    box = None
+    if proxy_size and (w > proxy_size or h > proxy_size):
+        size = thumbnail_size(image.size, proxy_size)
+        proxy = image.resize(size, resample=Image.NEAREST)
+        found = content_bbox(proxy, bg_pixel)
+        if found is not None:
+            # scale the proxy bbox back up with a proxy pixel to spare
+            sx, sy = w / size[0], h / size[1]
+            left, top, right, bottom = found
+            box = (
+                max(floor((left - 1) * sx), 0),
+                max(floor((top - 1) * sy), 0),
+                min(ceil((right + 1) * sx), w),
+                min(ceil((bottom + 1) * sy), h),
+            )
+    bbox = content_bbox(image, bg_pixel, box)
     # crop the difference
     return image.crop(bbox)
 
 
-def process_image(image: object, max_size: int = 500) -> object:
+def reduce_bit_depth(image: object, bits: int) -> object:
+    """
+    Reduce each RGB channel of an image to `bits` bits so the image
+    contains at most 2 ** (bits * 3) colors.
+
+    Reduced values are spread across the full 0-255 range so
+    pure black and pure white are kept.
+
+    :param image: PIL Image object
+    :param bits: bits per channel (1-8)
+    :returns: PIL Image object
+    :exception ValueError: bit depth out of range
+    """
+    if not 1 <= bits <= 8:
+        raise ValueError("Bit depth must be an integer between 1 and 8.")
+    shift = 8 - bits
+    levels = (1 << bits) - 1
+    table = [round((val >> shift) * 255 / levels) for val in range(256)]
+    return image.point(table * len(image.getbands()))
+
+
+def validate_quantize(quantize):
+    """
+    Check `quantize` is None, a bit depth (1-8) or a quantize method.
+
+    :param quantize: bits per channel (1-8) or a quantize method
+                     ("median-cut" or "octree")
+    :exception TypeError: quantize is a bool
+    :exception ValueError: bit depth out of range or unknown quantize method
+    """
+    if quantize is None:
+        return
+    if isinstance(quantize, bool):
+        # True is an int, don't quietly treat it as a 1 bit depth
+        raise TypeError("Quantize must be a bit depth or a quantize method.")
+    if isinstance(quantize, int):
+        if not 1 <= quantize <= 8:
+            raise ValueError("Bit depth must be an integer between 1 and 8.")
+    elif not isinstance(quantize, str) or quantize not in QUANTIZE_METHODS:
+        raise ValueError(
+            f"Quantize must be a bit depth or one of {tuple(QUANTIZE_METHODS)}."
+        )
+
+
+def quantize_image(image: object, quantize, colors: int = 256) -> object:
+    """
+    Quantize an RGB image so it has a bounded number of colors.
+
+    :param image: PIL Image object
+    :param quantize: bits per channel (1-8) or a quantize method
+                     ("median-cut" or "octree")
+    :param colors: maximum colors when using a quantize method (max 256)
+    :returns: PIL Image object
+    :exception TypeError: quantize is a bool
+    :exception ValueError: bit depth out of range or unknown quantize method
+    """
+    validate_quantize(quantize)
+    if isinstance(quantize, int):
+        return reduce_bit_depth(image, quantize)
+    quantized = image.quantize(colors=colors, method=QUANTIZE_METHODS[quantize])
+    return quantized.convert("RGB")
+
+
+def reopen_image(image: object) -> object:
+    """
+    Open a fresh copy of an image that hasn't been decoded yet so it
+    can be drafted without changing the size of the caller's image.
+
+    :param image: PIL Image object
+    :returns: PIL Image object (`image` itself if it can't be reopened)
+    """
+    if not image.tile:
+        # already decoded, drafting has no effect
+        return image
+    if image.filename:
+        return Image.open(image.filename)
+    fp = getattr(image, "fp", None)
+    if fp is None:
+        return image
+    position = fp.tell()
+    try:
+        fp.seek(0)
+        # the copy only reads the header here, pixels are read (from
+        # their own offsets) when it's loaded
+        return Image.open(fp)
+    finally:
+        fp.seek(position)
+
+
+def draft_image(image: object, max_size: int = 500) -> object:
+    """
+    Decode a large image close to `max_size` instead of at full resolution.
+
+    JPEGs use draft mode to decode straight at 1/2, 1/4 or 1/8 scale.
+    Other images are reduced by a whole factor using nearest neighbor
+    resampling so no new (blended) colors are introduced. Both sides of
+    the returned image are kept at least `max_size` when possible.
+    `image` itself is left at full resolution.
+
+    :param image: PIL Image object (not yet loaded for JPEG draft mode)
+    :param max_size: maximum size of the image for color sampling
+    :returns: PIL Image object
+    """
+    if image.format == "JPEG":
+        image = reopen_image(image)
+        image.draft(None, (max_size, max_size))
+    w, h = image.size
+    factor = min(w // max_size, h // max_size)
+    if factor > 1:
+        image = image.resize((w // factor, h // factor), resample=Image.NEAREST)
+    return image
+
+
+def has_transparency(image: object) -> bool:
+    """
+    Check if an image has any transparent pixels.
+
+    Images with an alpha band are only considered transparent if
+    at least one pixel isn't fully opaque.
+
+    :param image: PIL Image object
+    :returns: True if the image has transparency
+    """
+    if "transparency" in image.info:
+        return True
+    if image.mode == "P" and image.palette and image.palette.mode == "RGBA":
+        return True
+    if "A" not in image.getbands():
+        return False
+    alpha = image.getbands().index("A")
+    return image.getextrema()[alpha][0] < 255
+
+
+def flatten_image(image: object) -> object:
+    """
+    Convert an image to RGB, compositing it on a white background
+    first if it has any transparency.
+
+    :param image: PIL Image object
+    :returns: PIL Image object
+    """
+    if has_transparency(image):
+        # composite the image on a white background since it has transparency
+        image = image.convert("RGBA")
+        bg = Image.new("RGBA", image.size, (255, 255, 255))
+        comp = Image.alpha_composite(bg, image)
+        # convert composite image to RGB since we only need the RGB color values
+        return comp.convert("RGB")
+    # opaque images go straight to RGB without any compositing
+    return image.convert("RGB")
+
+
+def process_image(
+    image: object,
+    max_size: int = 500,
+    quantize=None,
+    draft: bool = False,
+    trim_proxy: int = None,
+) -> object:
     """
     Process the image for best color sampling results.
 
     :param image: PIL Image object
     :param max_size: maximum size of the image for color sampling
+                     (None to keep the full resolution)
+    :param quantize: optionally bound the number of colors in the processed
+                     image, bits per channel (1-8) or a quantize method
+                     ("median-cut" or "octree")
+    :param draft: decode or reduce the image close to `max_size` before
+                  compositing and trimming, much faster and lighter on
+                  large images but not pixel-identical to the exact path
+    :param trim_proxy: find the excess background on a copy no larger
+                       than `trim_proxy`, see `trim_excess`
     :returns: PIL Image object
     """
-    image = image.convert("RGBA")
+    if draft and max_size:
+        image = draft_image(image, max_size)
     # check to make sure image has pixels
     w, h = image.size
     if w == 0 or h == 0:
         raise ValueError("The provided image has no pixels.")
 
-    # composite the image on a white background just in case it has transparency
-    bg = Image.new("RGBA", image.size, (255, 255, 255))
-    comp = Image.alpha_composite(bg, image)
-    # convert composite image to RGB since we only need the RGB color values
-    comp = comp.convert("RGB")
+    comp = flatten_image(image)
     # crop the image if extra surrounding background pixels are found
-    comp = trim_excess(comp)
+    comp = trim_excess(comp, trim_proxy)
     # reduce the image down to `max_size` to speed up processing
-    if comp.width > max_size or comp.height > max_size:
+    if max_size and (comp.width > max_size or comp.height > max_size):
         comp.thumbnail((max_size, max_size), resample=0)
+    # merge near-duplicate shades so the color histogram stays small
+    if quantize is not None:
+        comp = quantize_image(comp, quantize)
+
+    return comp
+
+
+def thumbnail_size(size: tuple, max_size: int) -> tuple:
+    """
+    Calculate the size `Image.thumbnail` reduces an image of `size` to.
+
+    :param size: (width, height) of the image
+    :param max_size: maximum size of either side
+    :returns: (width, height) of the thumbnail
+    """
+    w, h = size
+    if w <= max_size and h <= max_size:
+        return size
+
+    def round_aspect(number, key):
+        return max(min(floor(number), ceil(number), key=key), 1)
+
+    x = y = max_size
+    aspect = w / h
+    if x / y >= aspect:
+        x = round_aspect(y * aspect, key=lambda n: abs(aspect - n / y))
+    else:
+        y = round_aspect(x / aspect, key=lambda n: 0 if n == 0 else abs(aspect - x / n))
+    return (x, y)
+
+
+def nearest_indices(length: int, new_length: int) -> list:
+    """
+    Source pixel indices picked when nearest neighbor resizing
+    `length` pixels down to `new_length` pixels.
+
+    The indices come straight from resizing a row of pixel indices
+    so they always match Pillow's own nearest neighbor resampling.
+
+    :param length: original number of pixels
+    :param new_length: resized number of pixels
+    :returns: list of source pixel indices
+    """
+    row = Image.new("I", (length, 1))
+    row.putdata(range(length))
+    resized = row.resize((new_length, 1), resample=Image.NEAREST)
+    return array("i", resized.tobytes()).tolist()
+
+
+def iter_strips(image: object, box: tuple = None, strip_height: int = 256):
+    """
+    Flatten an image to RGB one horizontal strip at a time.
+
+    Only one strip is composited (and converted) at once so no full
+    size RGBA or RGB copy of the image is ever made.
+
+    :param image: PIL Image object
+    :param box: (left, top, right, bottom) region to read, defaults to all
+    :param strip_height: rows per strip
+    :returns: generator of (top, RGB strip) tuples
+    """
+    left, top, right, bottom = box or (0, 0) + image.size
+    for y in range(top, bottom, strip_height):
+        strip = image.crop((left, y, right, min(y + strip_height, bottom)))
+        yield y, flatten_image(strip)
+
+
+def stream_bbox(image: object, strip_height: int = 256) -> tuple:
+    """
+    Find the region `trim_excess` would crop an image to, one strip
+    at a time.
+
+    :param image: PIL Image object
+    :param strip_height: rows per strip
+    :returns: (left, top, right, bottom) box
+    """
+    w, h = image.size
+    top_row = flatten_image(image.crop((0, 0, w, 1)))
+    bottom_row = flatten_image(image.crop((0, h - 1, w, h)))
+    corners = [
+        top_row.getpixel((0, 0)),
+        top_row.getpixel((w - 1, 0)),
+        bottom_row.getpixel((0, 0)),
+        bottom_row.getpixel((w - 1, 0)),
+    ]
+    bg_pixel = background_pixel(corners)
+    if bg_pixel is None:
+        return (0, 0, w, h)
+
+    bbox = None
+    for y, strip in iter_strips(image, strip_height=strip_height):
+        found = content_bbox(strip, bg_pixel)
+        if found is None:
+            continue
+        left, top, right, bottom = found
+        if bbox is None:
+            bbox = (left, y + top, right, y + bottom)
+        else:
+            bbox = (
+                min(bbox[0], left),
+                bbox[1],
+                max(bbox[2], right),
+                y + bottom,
+            )
+    # `trim_excess` keeps the whole image when it is all background
+    return bbox or (0, 0, w, h)
+
+
+def stream_image(
+    image: object,
+    max_size: int = 500,
+    quantize=None,
+    draft: bool = False,
+    strip_height: int = 256,
+) -> object:
+    """
+    Process a very large image one strip at a time.
+
+    Gives the same result as `process_image` but only a single strip
+    is ever composited, compared against the background and reduced at
+    once, so the extra memory used is bounded by `strip_height` instead
+    of the image size. The source image itself is still decoded by
+    Pillow (JPEGs can use `draft` to decode smaller).
+
+    :param image: PIL Image object
+    :param max_size: maximum size of the image for color sampling
+                     (None to keep the full resolution)
+    :param quantize: optionally bound the number of colors in the processed
+                     image, see `process_image`
+    :param draft: decode or reduce the image close to `max_size` first
+    :param strip_height: rows processed at once
+    :returns: PIL Image object
+    """
+    if draft and max_size:
+        image = draft_image(image, max_size)
+    w, h = image.size
+    if w == 0 or h == 0:
+        raise ValueError("The provided image has no pixels.")
 
+    left, top, right, bottom = stream_bbox(image, strip_height)
+    size = (right - left, bottom - top)
+    if max_size:
+        size = thumbnail_size(size, max_size)
+    # rows of the trimmed image kept by the nearest neighbor thumbnail
+    rows = nearest_indices(bottom - top, size[1])
+    comp = Image.new("RGB", size)
+    row = 0
+    for y, strip in iter_strips(image, (left, top, right, bottom), strip_height):
+        if size[1] == bottom - top and strip.width == size[0]:
+            comp.paste(strip, (0, y - top))
+            continue
+        # columns only depend on the widths so resizing a strip picks
+        # the same pixels as resizing the whole image would
+        if strip.width != size[0]:
+            strip = strip.resize((size[0], strip.height), resample=Image.NEAREST)
+        while row < len(rows) and rows[row] < y - top + strip.height:
+            line = rows[row] - (y - top)
+            comp.paste(strip.crop((0, line, size[0], line + 1)), (0, row))
+            row += 1
+    if quantize is not None:
+        comp = quantize_image(comp, quantize)
     return comp
+
+
+def stream_histogram(
+    image: object, quantize: int = None, strip_height: int = 256, engine: str = None
+) -> object:
+    """
+    Count every pixel of a very large image at full resolution, one
+    strip at a time, without making a processed copy of the image.
+
+    Gives the same counts as `get_histogram` on `process_image` with
+    `max_size=None`, while the extra memory used is bounded by
+    `strip_height` and the number of distinct colors.
+
+    :param image: PIL Image object
+    :param quantize: optionally reduce each channel to this many bits (1-8),
+                     quantize methods need the whole image and aren't supported
+    :param strip_height: rows processed at once
+    :param engine: histogram engine to use ("numpy" or "python")
+    :returns: `histogram.ColorHistogram` object
+    :exception TypeError: quantize is a bool
+    :exception ValueError: the image has no pixels or quantize isn't a bit depth
+    """
+    validate_quantize(quantize)
+    if isinstance(quantize, str):
+        raise ValueError("Streamed histograms only support a bit depth quantize.")
+    w, h = image.size
+    if w == 0 or h == 0:
+        raise ValueError("The provided image has no pixels.")
+
+    box = stream_bbox(image, strip_height)
+    strips = (strip for _, strip in iter_strips(image, box, strip_height))
+    if quantize is not None:
+        strips = (reduce_bit_depth(strip, quantize) for strip in strips)
+    return count_strips(strips, engine)
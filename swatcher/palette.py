@@ -1,9 +1,193 @@
+import sys
+
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from functools import lru_cache
+from itertools import accumulate, islice
 from math import sqrt, isqrt
+from time import perf_counter
 from PIL import Image, ImageDraw, ImageFont
-from swatcher.color import color_distance, normalize_rgb_values, rgb_2_hex, rgb_2_luma
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from swatcher.color import (
+    DISTANCE_METRICS,
+    NORMALIZED_VALUES,
+    color_distance,
+    delta_e_array,
+    delta_e_cie76,
+    delta_e_ciede2000,
+    lru_stats,
+    normalize_rgb_values,
+    rgb_2_hex,
+    rgb_2_lab,
+    rgb_2_lab_array,
+    rgb_2_luma,
+)
+from swatcher.histogram import ColorHistogram
+
+# default font of the `draw_swatches` hex labels, a font file name or path
+FONT_FACE = "Arial Bold.ttf"
+
+
+class _SampledColors:
+    """
+    Colors sampled into a palette.
+
+    Colors are compared using squared distances (no `sqrt`) and, once
+    there are enough of them for a linear scan to get slow, bucketed
+    into a uniform RGB grid with cells twice the sensitivity wide so
+    only the 8 cells around a color ever need checking.
+    """
+
+    grid_threshold = 32
+
+    def __init__(self, sensitivity: int):
+        # int(sqrt(d)) <= sensitivity is the same as d < (sensitivity + 1) ** 2
+        self.radius = sensitivity + 1
+        self.limit = self.radius ** 2
+        self.size = self.radius * 2
+        self.colors = []
+        self.cells = None
+
+    def __len__(self):
+        return len(self.colors)
+
+    def _key(self, color: tuple) -> tuple:
+        return tuple(val // self.size for val in color)
+
+    def _neighbors(self, color: tuple) -> list:
+        """Grid cells that could hold colors within the sensitivity of `color`."""
+        own, near = [], []
+        for val in color:
+            key, offset = divmod(val, self.size)
+            own.append(key)
+            near.append(key - 1 if offset < self.radius else key + 1)
+        (r, g, b), (nr, ng, nb) = own, near
+        return [
+            (r, g, b),
+            (nr, g, b),
+            (r, ng, b),
+            (r, g, nb),
+            (nr, ng, b),
+            (nr, g, nb),
+            (r, ng, nb),
+            (nr, ng, nb),
+        ]
 
-def sample(colors: list, max_colors: int = 8, sensitivity: int = 75) -> list:
+    def add(self, color: tuple):
+        self.colors.append(color)
+        if self.cells is not None:
+            self.cells.setdefault(self._key(color), []).append(color)
+        elif len(self.colors) > self.grid_threshold:
+            self.cells = {}
+            for found in self.colors:
+                self.cells.setdefault(self._key(found), []).append(found)
+
+    def near(self, color: tuple) -> bool:
+        """Check if `color` is within the sensitivity of any sampled color."""
+        r, g, b = color
+        limit = self.limit
+        if self.cells is None:
+            candidates = [self.colors]
+        else:
+            candidates = filter(None, map(self.cells.get, self._neighbors(color)))
+        for cell in candidates:
+            for fr, fg, fb in cell:
+                if (r - fr) ** 2 + (g - fg) ** 2 + (b - fb) ** 2 < limit:
+                    return True
+        return False
+
+
+SampleReport = namedtuple(
+    "SampleReport", ["palette", "considered", "candidates", "total", "pixels"]
+)
+SampleReport.__doc__ = """
+Sampled palette and how much of the color histogram was considered.
+
+palette: list of sampled RGB color tuples
+considered: number of colors walked before sampling stopped
+candidates: number of colors sampling was allowed to walk
+total: number of distinct colors
+pixels: share (0-1) of pixels covered by the considered colors,
+        or None if the color counts weren't supplied
+"""
+
+
+def _normalized(colors: list):
+    """
+    Iterate `colors` with any slight color differences in PIL sampling
+    cleaned-up, unpacking `ColorHistogram` colors straight to tuples.
+    Normalized histograms are only unpacked.
+    """
+    if isinstance(colors, ColorHistogram):
+        if np is not None:
+            return _normalized_numpy(colors.colors, not colors.normalized)
+        if colors.normalized:
+            return iter(colors)
+        n = NORMALIZED_VALUES
+        return ((n[c >> 16], n[(c >> 8) & 0xFF], n[c & 0xFF]) for c in colors.colors)
+    return map(normalize_rgb_values, colors)
+
+
+def _normalized_numpy(packed: object, normalize: bool = True):
+    """
+    Unpack (and clean-up) packed colors in growing vectorized chunks,
+    so sampling that stops early only unpacks the first few colors.
+    """
+    table = np.array(NORMALIZED_VALUES if normalize else range(256), dtype=np.uint8)
+    packed = np.frombuffer(packed, dtype=np.uint32)
+    start, size = 0, 256
+    while start < len(packed):
+        chunk = packed[start : start + size]
+        r = table[chunk >> 16].tolist()
+        g = table[(chunk >> 8) & 0xFF].tolist()
+        b = table[chunk & 0xFF].tolist()
+        yield from zip(r, g, b)
+        start += size
+        size = min(size * 4, 65536)
+
+
+def candidate_limit(
+    colors: list, max_candidates: int = None, coverage: float = None, counts=None
+) -> int:
+    """
+    Calculate how many of the most common colors should be considered
+    when sampling so the worst-case sampling time stays bounded.
+
+    :param colors: list of RGB color tuples sorted by most common
+    :param max_candidates: only consider the `max_candidates` most common colors
+    :param coverage: only consider the most common colors covering this
+                     share (0-1) of all pixels, requires `counts`
+    :param counts: pixel count of each color in `colors`
+    :returns: number of colors to consider
+    :exception ValueError: `coverage` was supplied without `counts`
+    """
+    limit = len(colors)
+    if max_candidates is not None:
+        limit = min(limit, max_candidates)
+    if coverage is not None:
+        if counts is None:
+            raise ValueError("Coverage requires the pixel count of each color.")
+        totals = list(accumulate(counts))
+        if totals:
+            needed = coverage * totals[-1]
+            limit = min(limit, bisect_left(totals, needed) + 1)
+    return limit
+
+
+def sample(
+    colors: list,
+    max_colors: int = 8,
+    sensitivity: int = 75,
+    max_candidates: int = None,
+    coverage: float = None,
+    counts: list = None,
+    metric: str = "rgb",
+) -> list:
     """
     Sample most common colors from a PIL Image object.
 
@@ -11,35 +195,397 @@ def sample(colors: list, max_colors: int = 8, sensitivity: int = 75) -> list:
     :param max_colors: maximum number of colors to return
     :param sensitivity: how perceptively different (Euclidean Distance) a color
                     must be from others to be included in the sampled palette.
+    :param max_candidates: only consider the `max_candidates` most common colors
+    :param coverage: only consider the most common colors covering this
+                     share (0-1) of all pixels, requires `counts`
+    :param counts: pixel count of each color in `colors`
+    :param metric: color distance metric, "rgb" (Euclidean distance) or the
+                   perceptual "cie76" or "ciede2000" where `sensitivity`
+                   is the ΔE color difference
     :returns: list of most common colors in RGB tuples (255, 255, 255)
+    :exception ValueError: unknown distance metric
+    """
+    return sample_report(
+        colors, max_colors, sensitivity, max_candidates, coverage, counts, metric
+    ).palette
+
+
+def sample_report(
+    colors: list,
+    max_colors: int = 8,
+    sensitivity: int = 75,
+    max_candidates: int = None,
+    coverage: float = None,
+    counts: list = None,
+    metric: str = "rgb",
+) -> SampleReport:
+    """
+    Sample most common colors like `sample` and report how much of
+    the color histogram was considered.
+
+    :returns: `SampleReport` named tuple
     """
+    if metric not in DISTANCE_METRICS:
+        raise ValueError(f"Distance metric must be one of {DISTANCE_METRICS}.")
+    candidates = candidate_limit(colors, max_candidates, coverage, counts)
 
     # reduce all found colors using supplied sensitivity
-    sampled_colors = []
+    if metric != "rgb":
+        sample_perceptual = _sample_perceptual_python
+        if np is not None:
+            sample_perceptual = _sample_perceptual_numpy
+        sampled, considered = sample_perceptual(
+            colors, max_colors, sensitivity, candidates, metric
+        )
+    else:
+        sampled_colors = _SampledColors(sensitivity)
+        considered = 0
+        for color in islice(_normalized(colors), candidates):
+            # if max_color limit reached stop looking
+            if len(sampled_colors) == max_colors:
+                break
+            considered += 1
+            # check the Euclidean distance for a color against colors
+            # already appended to determine if it shoule be ignored
+            if not sampled_colors.near(color):
+                sampled_colors.add(color)
+        sampled = sampled_colors.colors
+
+    pixels = None
+    if counts is not None and len(counts):
+        pixels = sum(islice(counts, considered)) / sum(counts)
+    return SampleReport(sampled, considered, candidates, len(colors), pixels)
+
+
+def _sample_perceptual_python(
+    colors: list, max_colors: int, sensitivity: int, candidates: int, metric: str
+) -> tuple:
+    """
+    Pure-Python perceptual sampling, each distinct color is converted
+    to Lab once (cached by `rgb_2_lab`).
+
+    :returns: tuple of (sampled colors, number of colors considered)
+    """
+    distance = delta_e_cie76 if metric == "cie76" else delta_e_ciede2000
+    # int(distance) <= sensitivity is the same as distance < sensitivity + 1
+    limit = sensitivity + 1
+    sampled, labs = [], []
+    considered = 0
+    for color in islice(_normalized(colors), candidates):
+        if len(sampled) == max_colors:
+            break
+        considered += 1
+        lab = rgb_2_lab(color)
+        if all(distance(lab, found) >= limit for found in labs):
+            sampled.append(color)
+            labs.append(lab)
+    return sampled, considered
+
+
+def _sample_perceptual_numpy(
+    colors: list, max_colors: int, sensitivity: int, candidates: int, metric: str
+) -> tuple:
+    """
+    NumPy perceptual sampling.
+
+    Colors are converted to Lab in growing vectorized chunks, keeping
+    the color difference of each color in the chunk to its nearest
+    sampled color so the next accepted color is found with a vectorized
+    scan, and sampling that stops early only converts the first colors.
+
+    :returns: tuple of (sampled colors, number of colors considered)
+    """
+    limit = sensitivity + 1
+    sampled, labs = [], []
+    start, size = 0, 256
+    while start < candidates and len(sampled) < max_colors:
+        stop = min(start + size, candidates)
+        data = _color_array(colors[start:stop])
+        chunk = rgb_2_lab_array(data)
+        nearest = np.full(len(chunk), np.inf)
+        for lab in labs:
+            nearest = np.minimum(nearest, delta_e_array(chunk, lab, metric))
+        position = 0
+        while len(sampled) < max_colors:
+            hits = np.flatnonzero(nearest[position:] >= limit)
+            if not hits.size:
+                break
+            position += int(hits[0])
+            lab = tuple(chunk[position].tolist())
+            sampled.append(tuple(data[position].tolist()))
+            labs.append(lab)
+            nearest = np.minimum(nearest, delta_e_array(chunk, lab, metric))
+            position += 1
+        if len(sampled) == max_colors:
+            return sampled, start + position
+        start, size = stop, size * 4
+    return sampled, candidates
+
+
+def sample_many(colors: list, settings: list, metric: str = "rgb") -> list:
+    """
+    Sample palettes for many (max_colors, sensitivity) settings in a
+    single pass over `colors`.
+
+    Settings that have sampled the same colors so far are grouped
+    together, so each color is normalized once and compared once
+    against each distinct palette no matter how many settings share it.
+
+    :param colors: list of RGB color tuples eg. [(0, 0, 0), (255, 255, 255)]
+    :param settings: list of (max_colors, sensitivity) tuples
+    :param metric: color distance metric, perceptual metrics ("cie76" or
+                   "ciede2000") sample each setting on its own
+    :returns: list of sampled palettes in the same order as `settings`
+    """
+    if metric != "rgb":
+        return [sample(colors, m, s, metric=metric) for m, s in settings]
+    if np is not None:
+        return _sample_many_numpy(colors, settings)
+    return _sample_many_python(colors, settings)
+
+
+def _sample_many_python(colors: list, settings: list) -> list:
+    """Pure-Python `sample_many` walking every color once."""
+    palettes = [[] for _ in settings]
+    # (sampled colors, settings ordered by sensitivity) still sampling
+    members = [i for i, (max_colors, _) in enumerate(settings) if max_colors > 0]
+    members.sort(key=lambda i: settings[i][1])
+    groups = [((), members)] if members else []
+    normalized = getattr(colors, "normalized", False)
     for color in colors:
-        # if max_color limit reached stop looking
-        if len(sampled_colors) == max_colors:
+        # if every max_color limit is reached stop looking
+        if not groups:
             break
         # clean-up any slight color differences in PIL sampling
-        color = normalize_rgb_values(color)
-        # if most common color (first color) append it
-        if sampled_colors == []:
-            sampled_colors.append(color)
+        if not normalized:
+            color = normalize_rgb_values(color)
+        distances = {}
+        updated = []
+        for sampled, members in groups:
+            # find the nearest sampled color, stopping early once
+            # it is close enough for every setting to ignore the color
+            lowest = settings[members[0]][1]
+            nearest = None
+            for found in sampled:
+                if found not in distances:
+                    distances[found] = color_distance(color, found)
+                if nearest is None or distances[found] < nearest:
+                    nearest = distances[found]
+                    if nearest <= lowest:
+                        break
+            # settings with a sensitivity below the nearest distance accept the color
+            k = len(members)
+            if nearest is not None:
+                k = 0
+                while k < len(members) and settings[members[k]][1] < nearest:
+                    k += 1
+            if k < len(members):
+                updated.append((sampled, members[k:]))
+            if k:
+                sampled = sampled + (color,)
+                remaining = []
+                for i in members[:k]:
+                    if len(sampled) == settings[i][0]:
+                        palettes[i] = list(sampled)
+                    else:
+                        remaining.append(i)
+                if remaining:
+                    updated.append((sampled, remaining))
+        groups = updated
+
+    for sampled, members in groups:
+        for i in members:
+            palettes[i] = list(sampled)
+    return palettes
+
+
+def _next_accepted(nearest: object, sensitivity: int) -> int:
+    """
+    Find the first color further than `sensitivity` from every sampled
+    color, given the squared distance of each color to its `nearest`
+    sampled color.
+
+    :returns: index into `nearest`, or None if no color is found
+    """
+    # int(sqrt(d)) > sensitivity is the same as d >= (sensitivity + 1) ** 2
+    threshold = (sensitivity + 1) ** 2
+    start, size = 0, 256
+    while start < len(nearest):
+        hits = np.flatnonzero(nearest[start : start + size] >= threshold)
+        if hits.size:
+            return start + int(hits[0])
+        start += size
+        size *= 4
+    return None
+
+
+def _color_array(colors: list) -> object:
+    """Unpack and clean-up `colors` into a NumPy array with shape (n, 3)."""
+    if isinstance(colors, ColorHistogram):
+        packed = np.frombuffer(colors.colors, dtype=np.uint32).astype(np.int32)
+        data = np.stack([packed >> 16, (packed >> 8) & 0xFF, packed & 0xFF], axis=1)
+    else:
+        data = np.array(colors, dtype=np.int32).reshape(-1, 3)
+    # clean-up any slight color differences in PIL sampling
+    if not getattr(colors, "normalized", False):
+        data = np.where(data <= 3, 0, np.where(data >= 253, 255, data))
+    return data
+
+
+def _sample_many_numpy(colors: list, settings: list) -> list:
+    """
+    NumPy `sample_many`.
+
+    Every group of settings sharing the same sampled colors is followed
+    on its own, keeping the squared distance of each remaining color to
+    its nearest sampled color so the next accepted color is found with a
+    vectorized scan instead of walking each color.
+    """
+    palettes = [[] for _ in settings]
+    data = _color_array(colors)
+    channels = [np.ascontiguousarray(data[:, i]) for i in range(3)]
+    members = [i for i, (max_colors, _) in enumerate(settings) if max_colors > 0]
+    members.sort(key=lambda i: settings[i][1])
+    # (sampled colors, settings ordered by sensitivity,
+    #  index of the next color, nearest distances from that color on)
+    unsampled = np.full(len(data), np.iinfo(np.int32).max, dtype=np.int32)
+    groups = [((), members, 0, unsampled)] if members else []
+    while groups:
+        sampled, members, start, nearest = groups.pop()
+        j = _next_accepted(nearest, settings[members[0]][1])
+        if j is None:
+            for i in members:
+                palettes[i] = list(sampled)
             continue
-        # calculate Euclidean distance for a color against colors
-        # already appended to determine if it shoule be ignored
-        if not any(
-            color_distance(color, found) <= sensitivity for found in sampled_colors
-        ):
-            sampled_colors.append(color)
+        # settings with a sensitivity below the nearest distance accept the color
+        distance = isqrt(int(nearest[j]))
+        k = 0
+        while k < len(members) and settings[members[k]][1] < distance:
+            k += 1
+        if k < len(members):
+            groups.append((sampled, members[k:], start + j + 1, nearest[j + 1 :]))
+        color = tuple(data[start + j].tolist())
+        sampled = sampled + (color,)
+        remaining = []
+        for i in members[:k]:
+            if len(sampled) == settings[i][0]:
+                palettes[i] = list(sampled)
+            else:
+                remaining.append(i)
+        if remaining:
+            rest = start + j + 1
+            distances = sum((c[rest:] - v) ** 2 for c, v in zip(channels, color))
+            nearest = np.minimum(nearest[j + 1 :], distances)
+            groups.append((sampled, remaining, rest, nearest))
+
+    return palettes
+
+
+class SensitivityIndex:
+    """
+    Precomputed palettes for every sensitivity of a list of colors.
+
+    Sampling is greedy so a palette sampled with fewer `max_colors` is
+    always the start of a palette sampled with more. The index samples
+    each sensitivity once with the largest `max_colors` and stores the
+    sensitivity ranges that share the same palette, so any palette
+    becomes a lookup instead of a new sample.
+    """
+
+    def __init__(
+        self,
+        colors: list,
+        max_colors: int = 20,
+        max_sensitivity: int = 250,
+        max_candidates: int = None,
+    ):
+        """
+        Build a sensitivity index.
+
+        :param colors: list of RGB color tuples eg. [(0, 0, 0), (255, 255, 255)]
+        :param max_colors: largest `max_colors` the index can answer
+        :param max_sensitivity: largest `sensitivity` the index can answer
+        :param max_candidates: maximum number of colors to walk while building,
+                               bounds the build time on images with many colors
+        """
+        start = perf_counter()
+        self.max_colors = max_colors
+        self.max_sensitivity = max_sensitivity
+        candidates = colors
+        exhausted = True
+        if max_candidates is not None and len(colors) > max_candidates:
+            candidates = colors[:max_candidates]
+            exhausted = False
+        settings = [(max_colors, s) for s in range(max_sensitivity + 1)]
+        # lowest sensitivity of each range, its palette, and whether the
+        # palette is complete (filled up or every color was walked)
+        self._bounds = []
+        self._palettes = []
+        self._complete = []
+        for sensitivity, sampled in enumerate(sample_many(candidates, settings)):
+            sampled = tuple(sampled)
+            complete = exhausted or len(sampled) == max_colors
+            if (
+                self._palettes
+                and self._palettes[-1] == sampled
+                and self._complete[-1] == complete
+            ):
+                continue
+            self._bounds.append(sensitivity)
+            self._palettes.append(sampled)
+            self._complete.append(complete)
+        self.build_time = perf_counter() - start
+
+    @property
+    def ranges(self) -> list:
+        """List of (lowest sensitivity, highest sensitivity, palette) ranges."""
+        highs = [b - 1 for b in self._bounds[1:]] + [self.max_sensitivity]
+        return list(zip(self._bounds, highs, self._palettes))
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the index in bytes."""
+        colors = {color for sampled in self._palettes for color in sampled}
+        return (
+            sum(
+                sys.getsizeof(x) for x in (self._bounds, self._palettes, self._complete)
+            )
+            + sum(sys.getsizeof(sampled) for sampled in self._palettes)
+            + sum(sys.getsizeof(color) for color in colors)
+        )
+
+    def lookup(self, max_colors: int, sensitivity: int) -> list:
+        """
+        Look up a sampled palette.
 
-    return sampled_colors
+        :param max_colors: maximum number of colors to return
+        :param sensitivity: how perceptively different (Euclidean Distance) a color
+                          must be from others to be included in the sampled palette.
+        :returns: list of rgb color tuples, or None if the index can't answer
+        """
+        if not 0 <= sensitivity <= self.max_sensitivity or max_colors > self.max_colors:
+            return None
+        i = bisect_right(self._bounds, sensitivity) - 1
+        sampled = self._palettes[i]
+        if not self._complete[i] and len(sampled) < max_colors:
+            return None
+        return list(sampled[:max_colors])
 
+    def __repr__(self):
+        return (
+            f"SensitivityIndex(ranges={len(self._bounds)}, "
+            f"nbytes={self.nbytes}, build_time={self.build_time:.4f})"
+        )
 
+
+@lru_cache(maxsize=32)
 def set_font(fontface: str, size: int) -> object:
     """
     Setup PIL ImageFont objects in the given font and for use when drawing.
 
+    Fonts are loaded once per (fontface, size) and cached for the whole
+    process, so missing fonts are only searched for (and reported) once.
+
     :param fontface: a filename or file-like object containing a
                      TrueType font. If the file is not found in this
                      filename, the loader may also search in other
@@ -57,6 +603,28 @@ def set_font(fontface: str, size: int) -> object:
     return font
 
 
+@lru_cache(maxsize=1024)
+def _label_mask(text: str, fontface: str, size: int) -> tuple:
+    """
+    Render `text` once into a mask centered on (0, 0), returns the
+    mask and the offset of its top left corner.
+    """
+    font = set_font(fontface, size)
+    left, top, right, bottom = font.getbbox(text, anchor="mm")
+    mask = Image.new("L", (right - left, bottom - top))
+    ImageDraw.Draw(mask).text((-left, -top), text, fill=255, font=font, anchor="mm")
+    return mask, (left, top)
+
+
+def cache_stats() -> dict:
+    """
+    Statistics of the font and rendered label caches.
+
+    :returns: dict of cache name to hits, misses, maxsize and size
+    """
+    return {"font": lru_stats(set_font), "label": lru_stats(_label_mask)}
+
+
 def perfect_square(i: int) -> bool:
     """Determine is a number is a perfect square"""
     return i == isqrt(i) ** 2
@@ -86,12 +654,15 @@ def cols_and_rows(i: int) -> tuple:
     return (cols, rows)
 
 
-def draw_swatches(colors: list, size: int = 200) -> object:
+def draw_swatches(colors: list, size: int = 200, fontface: str = None) -> object:
     """
     Generate a PIL Image object of color swatches.
 
+    Each distinct hex label is only rendered once (see `cache_stats`).
+
     :param colors: a list of RGB color tuples (or lists)
     :param size: width in pixels of each color swatch (min=150, max=500)
+    :param fontface: label font file name or path (defaults to `FONT_FACE`)
     :returns: PIL Image object
     """
 
@@ -113,7 +684,7 @@ def draw_swatches(colors: list, size: int = 200) -> object:
     # create a new image and setup drawing object and font
     image = Image.new("RGBA", (width, height), (255, 255, 255, 0))
     d = ImageDraw.Draw(image)
-    font = set_font("Arial Bold.ttf", size // 6)
+    fontface = fontface or FONT_FACE
 
     # iterate through all colors to create swatches
     for i, color in enumerate(colors):
@@ -134,8 +705,9 @@ def draw_swatches(colors: list, size: int = 200) -> object:
             text_fill = "black"
         else:
             text_fill = "white"
-        # calculate the text center position and insert
+        # calculate the text center position and insert the rendered label
         cp = [((p1[0] + p2[0]) // 2), ((p1[1] + p2[1]) // 2)]
-        d.text(xy=cp, text=hex, fill=text_fill, anchor="mm", font=font)
+        mask, (left, top) = _label_mask(hex, fontface, size // 6)
+        image.paste(text_fill, (cp[0] + left, cp[1] + top), mask)
 
     return image
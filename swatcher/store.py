@@ -0,0 +1,210 @@
+"""
+    Swatcher histogram stores
+    -------------------------
+    Keep the color histograms of uploaded images on the server keyed
+    by an upload id, so a web app only needs to keep the id in the
+    session and resampling is a lookup instead of recounting the image
+    (or decoding every color from the session).
+
+    store = MemoryStore(max_entries=256, ttl=3600)
+    store.put(upload_id, s._colors)
+    colors = store.get(upload_id)
+
+    Every store has the same `get`, `put`, `delete`, `clear` and `stats`
+    so they can be swapped without changing the app. Entries expire `ttl`
+    seconds after they were last used.
+"""
+
+import os
+import re
+import time
+
+from collections import OrderedDict
+from .cache import HistogramCache
+from .histogram import ColorHistogram, open_histogram
+
+# upload ids become file names so only allow plain word characters
+VALID_KEY = re.compile(r"[A-Za-z0-9_-]{1,128}")
+
+
+def validate_key(key: str):
+    """Check `key` is safe to use as a file name."""
+    if not isinstance(key, str) or not VALID_KEY.fullmatch(key):
+        raise ValueError("Store keys must be 1-128 letters, digits, '_' or '-'.")
+
+
+class MemoryStore:
+    """
+    In-memory store of color histograms with least recently used
+    eviction and expiry.
+
+    Only works within a single process, use `FileStore` when the app
+    runs in several worker processes.
+    """
+
+    def __init__(self, max_entries: int = 128, ttl: float = None, clock=None):
+        """
+        Initialize an in-memory histogram store.
+
+        :param max_entries: maximum number of histograms kept
+        :param ttl: seconds an unused histogram is kept (None keeps it
+                    until evicted)
+        :param clock: function returning the current time in seconds
+                      (defaults to `time.monotonic`)
+        """
+        if max_entries < 1:
+            raise ValueError("Max entries must be at least 1.")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock or time.monotonic
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> object:
+        """
+        Get a stored histogram.
+
+        :param key: upload id
+        :returns: `ColorHistogram` object or None
+        """
+        entry = self._entries.get(key)
+        now = self._clock()
+        if entry is not None and self.ttl is not None and now - entry[0] > self.ttl:
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        # mark the entry as recently used
+        self._entries[key] = (now, entry[1])
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, histogram: ColorHistogram):
+        """
+        Store a histogram, evicting the least recently used histograms
+        if there are more than `max_entries`.
+
+        :param key: upload id
+        :param histogram: `ColorHistogram` object
+        """
+        self._entries[key] = (self._clock(), histogram)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        """Remove a stored histogram (if there is one)."""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove every stored histogram."""
+        self._entries.clear()
+
+    @property
+    def stats(self) -> dict:
+        """Store hits, misses, evictions, expirations, entries and size in bytes."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "entries": len(self._entries),
+            "bytes": sum(entry[1].nbytes for entry in self._entries.values()),
+        }
+
+    def __repr__(self):
+        return f"MemoryStore({self.stats})"
+
+
+class FileStore(HistogramCache):
+    """
+    Local file store of color histograms that every worker process
+    on the machine can share.
+
+    Histograms are kept in the binary format of `ColorHistogram.to_bytes`
+    and memory-mapped when read, so every process shares one copy.
+    Entries expire `ttl` seconds after they were last used and the least
+    recently used entries are evicted once the store grows over
+    `max_bytes`.
+    """
+
+    def __init__(
+        self, directory: str, max_bytes: int = 256 * 1024 * 1024, ttl: float = None
+    ):
+        """
+        Initialize a file histogram store.
+
+        :param directory: directory to store histograms in
+        :param max_bytes: maximum total size of all stored histograms
+        :param ttl: seconds an unused histogram is kept (None keeps it
+                    until evicted)
+        """
+        super().__init__(directory, max_bytes)
+        self.ttl = ttl
+        self.expirations = 0
+
+    def _path(self, key: str) -> str:
+        validate_key(key)
+        return super()._path(key)
+
+    def _expired(self, fp: str) -> bool:
+        return self.ttl is not None and time.time() - os.path.getmtime(fp) > self.ttl
+
+    def get(self, key: str) -> object:
+        """
+        Get a stored histogram.
+
+        :param key: upload id
+        :returns: `ColorHistogram` object or None
+        """
+        fp = self._path(key)
+        try:
+            if self._expired(fp):
+                self.delete(key)
+                self.expirations += 1
+                raise FileNotFoundError(fp)
+            histogram = open_histogram(fp)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self._touch(fp)
+        self.hits += 1
+        return histogram
+
+    def delete(self, key: str):
+        """Remove a stored histogram (if there is one)."""
+        fp = self._path(key)
+        try:
+            size = os.path.getsize(fp)
+            os.remove(fp)
+        except OSError:
+            return
+        self._size -= size
+
+    def expire(self):
+        """Remove every histogram unused for more than `ttl` seconds."""
+        for fp in self._entries():
+            try:
+                if not self._expired(fp):
+                    continue
+                size = os.path.getsize(fp)
+                os.remove(fp)
+            except OSError:
+                continue
+            self._size -= size
+            self.expirations += 1
+
+    @property
+    def stats(self) -> dict:
+        """Store hits, misses, evictions, expirations, entries and size in bytes."""
+        return dict(super().stats, expirations=self.expirations)
+
+    def __repr__(self):
+        return f"FileStore({self.directory!r}, {self.stats})"
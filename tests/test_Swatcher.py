@@ -4,7 +4,7 @@ import tempfile
 
 from io import BytesIO
 from PIL import Image, ImageDraw
-from swatcher import Swatcher
+from swatcher import Swatcher, export
 
 
 def create_test_image_bytes():
@@ -85,3 +85,137 @@ def test_13():  # export location does not exist
         temp_dir.cleanup()
         temp_path = os.path.join(temp_dir.name, "no_longer.txt")
         path = IMG.export_ase_file(temp_path)
+
+
+def test_14():  # sample many settings at once
+    assert IMG.sample_many([(1, 75), (6, 250)]) == [
+        [(255, 0, 0)],
+        [(255, 0, 0), (0, 0, 255), (255, 255, 255)],
+    ]
+
+
+def test_15():  # sample many settings with bad input
+    with pytest.raises(ValueError):
+        IMG.sample_many([(8, 5000)])
+
+
+def test_16():  # sensitivity index lookups
+    index = IMG.build_index()
+    assert IMG.index is index
+    IMG.sample(8, 75)
+    assert IMG.palette == [(255, 0, 0), (0, 0, 255), (255, 255, 255)]
+    IMG.max_colors = 2
+    assert IMG.palette == [(255, 0, 0), (0, 0, 255)]
+
+
+def test_17():  # bounded sampling reports considered colors
+    img = create_test_image_bytes()
+    img.max_candidates = 1
+    assert img.palette == [(255, 0, 0)]
+    assert img.sample_report.candidates == 1
+    img.max_candidates = None
+    img.coverage = 1
+    assert img.palette == [(255, 0, 0), (0, 0, 255), (255, 255, 255)]
+    assert img.sample_report.pixels == 1
+
+
+def test_18():  # bounded sampling with bad input
+    with pytest.raises(ValueError):
+        IMG.coverage = 2
+
+
+def test_19():  # pipeline stages run on first access
+    img = create_test_image_bytes()
+    assert img._processed_image is None
+    assert img._histogram is None
+    assert img._palette is None
+    assert img.processed_image.size == (500, 333)
+    assert img._histogram is None
+    assert img.palette == [(255, 0, 0), (0, 0, 255), (255, 255, 255)]
+    assert img._histogram is not None
+
+
+def test_20():  # bad sample settings still raise during creation
+    temp = BytesIO()
+    Image.new("RGB", (10, 10)).save(temp, "PNG")
+    with pytest.raises(ValueError):
+        Swatcher(temp, max_colors=100)
+
+
+def test_21():  # streamed images give the same palette
+    img = create_test_image_bytes()
+    streamed = Swatcher(img._file, stream=True)
+    assert streamed.processed_image.tobytes() == img.processed_image.tobytes()
+    assert streamed.palette == img.palette
+
+
+def test_22():  # full resolution streamed color counts
+    img = create_test_image_bytes()
+    full = Swatcher(img._file, max_size=None, stream=True)
+    assert sum(full._counts) == 600 * 400
+    assert full.palette == Swatcher(img._file, max_size=None).palette
+    with pytest.raises(ValueError):
+        Swatcher(img._file, max_size=0)
+
+
+def test_23():  # perceptual distance metric
+    img = create_test_image_bytes()
+    img.metric = "ciede2000"
+    assert img.sample(sensitivity=20) == [(255, 0, 0), (0, 0, 255), (255, 255, 255)]
+    assert img.sample(metric="cie76") == img.palette
+    assert img.sample_many([(2, 75)]) == [[(255, 0, 0), (0, 0, 255)]]
+    with pytest.raises(ValueError):
+        img.metric = "hsv"
+
+
+def test_24():  # clustering palette extraction
+    img = create_test_image_bytes()
+    with pytest.raises(ValueError):
+        img.method = "dbscan"
+    img.method = "median-cut"
+    assert len(img.palette) == 3
+    assert round(sum(img.sample_report.weights), 6) == 1
+    pytest.importorskip("numpy")
+    palette = img.sample(max_colors=3, method="kmeans", seed=1)
+    assert len(palette) == 3
+    assert img.sample_report.weights[0] >= img.sample_report.weights[-1]
+
+
+def test_25():  # reuse a saved histogram in another Swatcher
+    img = create_test_image_bytes()
+    fp = img.save_histogram(os.path.join(TEMP_DIR.name, "colors.swch"))
+    img.sample(max_colors=2)
+    # a different image shows the saved histogram is used instead
+    temp = BytesIO()
+    Image.new("RGB", (10, 10), (0, 255, 0)).save(temp, "PNG")
+    other = Swatcher(temp, max_colors=2, histogram=fp)
+    assert isinstance(other._colors.colors, memoryview)
+    assert other.palette == img.palette
+
+
+def test_26():  # export palettes of many images to one grouped ASE file
+    img = create_test_image_bytes()
+    fp = export.export_ase_groups([img, img], os.path.join(TEMP_DIR.name, "catalog"))
+    with open(fp, "rb") as file:
+        data = file.read()
+    name = os.path.basename(img.path).encode("utf-16be")
+    assert data.count(name) == 2
+    assert data[8:12] == (2 * (len(img.palette) + 2)).to_bytes(4, "big")
+
+
+def test_27():  # draft mode leaves the opened image at full resolution
+    img = Image.new("RGB", (4000, 3000), (255, 0, 0))
+    temp = BytesIO()
+    img.save(temp, "JPEG")
+    s = Swatcher(temp, max_colors=1, draft=True)
+    assert s.processed_image.size == (500, 375)
+    assert s.image.size == (4000, 3000)
+
+
+def test_28():  # quantize is validated when the Swatcher is created
+    temp = BytesIO()
+    Image.new("RGB", (10, 10)).save(temp, "PNG")
+    for quantize, error in (("bogus", ValueError), (9, ValueError), (True, TypeError)):
+        with pytest.raises(error):
+            Swatcher(temp, quantize=quantize)
+    assert Swatcher(temp, quantize="octree").palette == [(0, 0, 0)]
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import pytest
+import tempfile
+import threading
+import time
+
+from io import BytesIO
+from PIL import Image, ImageDraw, UnidentifiedImageError
+from swatcher import Swatcher, aio, export
+
+
+def create_test_image_bytes() -> BytesIO:
+    img = Image.new("RGB", (600, 400), (255, 255, 255))
+    d = ImageDraw.Draw(img)
+    d.rectangle((0, 0, 200, 400), (255, 0, 0))
+    d.rectangle((400, 0, 600, 400), (0, 0, 255))
+    temp = BytesIO()
+    img.save(temp, "PNG")
+    temp.seek(0)
+    return temp
+
+
+@pytest.fixture(autouse=True)
+def reset_pool():
+    yield
+    aio.configure()
+
+
+def test_01():  # open and sample without blocking the event loop
+    async def main():
+        s = await Swatcher.open_async(create_test_image_bytes(), max_colors=2)
+        assert s._histogram is not None
+        return s.palette, await s.sample_async(max_colors=3)
+
+    palette, sampled = asyncio.run(main())
+    assert palette == Swatcher(create_test_image_bytes(), max_colors=2).palette
+    assert sampled == Swatcher(create_test_image_bytes()).sample(max_colors=3)
+
+
+def test_02():  # async exports match the sync exports
+    colors = [(255, 0, 0), (0, 0, 255)]
+    with tempfile.TemporaryDirectory() as temp:
+
+        async def main():
+            file = await aio.write_ase_async(colors)
+            fp = await aio.export_ase_async(colors, os.path.join(temp, "async"))
+            s = Swatcher(create_test_image_bytes())
+            s_fp = await s.export_ase_file_async(os.path.join(temp, "swatcher"))
+            return file.read(), fp, s_fp
+
+        data, fp, s_fp = asyncio.run(main())
+        assert data == export.write_ase_file(colors).read()
+        with open(fp, "rb") as file:
+            assert file.read() == data
+        assert s_fp.endswith("swatcher.SWATCHER.ase")
+
+
+def test_03():  # calls over the concurrency limit wait their turn
+    aio.configure(max_workers=4, max_concurrent=2)
+    lock = threading.Lock()
+    running, peak = 0, 0
+
+    def work():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+
+    async def main():
+        await asyncio.gather(*[aio.run(work) for _ in range(8)])
+
+    asyncio.run(main())
+    assert peak == 2
+
+
+def test_04():  # cancelled calls that haven't started never run
+    aio.configure(max_workers=1, max_concurrent=4)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def block():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    async def main():
+        first = asyncio.create_task(aio.run(block))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        queued = asyncio.create_task(aio.run(calls.append, 1))
+        await asyncio.sleep(0.01)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        release.set()
+        return await first
+
+    assert asyncio.run(main()) == "done"
+    assert calls == []
+
+
+def test_05():  # errors are raised in the awaiting task
+    with pytest.raises(ValueError):
+        aio.configure(max_concurrent=0)
+
+    async def main():
+        await aio.run(Swatcher, BytesIO(b"not an image"))
+
+    with pytest.raises(UnidentifiedImageError):
+        asyncio.run(main())
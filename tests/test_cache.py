@@ -0,0 +1,137 @@
+import os
+import pytest
+import tempfile
+
+from io import BytesIO
+from PIL import Image, ImageDraw
+from swatcher import Swatcher
+from swatcher.cache import HASH_CHUNK_SIZE, HistogramCache
+from swatcher.histogram import ColorHistogram
+
+
+HISTOGRAM = ColorHistogram.from_colors(
+    [(255, 0, 0), (0, 0, 255), (255, 255, 255)], [400, 300, 100]
+)
+
+
+def create_test_image_bytes(fill: tuple = (255, 0, 0)) -> BytesIO:
+    img = Image.new("RGB", (600, 400), (255, 255, 255))
+    d = ImageDraw.Draw(img)
+    d.rectangle((0, 0, 200, 400), fill)
+    temp = BytesIO()
+    img.save(temp, "PNG")
+    temp.seek(0)
+    return temp
+
+
+def test_01():  # keys depend on file bytes and processing options
+    assert HistogramCache.key(b"abc", draft=False) == HistogramCache.key(
+        b"abc", draft=False
+    )
+    assert HistogramCache.key(b"abc", draft=False) != HistogramCache.key(
+        b"abc", draft=True
+    )
+    assert HistogramCache.key(b"abc") != HistogramCache.key(b"abd")
+
+
+def test_02():  # hits and misses
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = HistogramCache(temp_dir)
+        assert cache.get("missing") is None
+        cache.put("key", HISTOGRAM)
+        assert cache.get("key") == HISTOGRAM
+        assert cache.stats["hits"] == 1
+        assert cache.stats["misses"] == 1
+        assert cache.stats["entries"] == 1
+
+
+def test_03():  # least recently used entries are evicted
+    with tempfile.TemporaryDirectory() as temp_dir:
+        size = len(HISTOGRAM.to_bytes())
+        cache = HistogramCache(temp_dir, max_bytes=size * 2)
+        cache.put("a", HISTOGRAM)
+        cache.put("b", HISTOGRAM)
+        os.utime(cache._path("a"), (0, 0))
+        os.utime(cache._path("b"), (1, 1))
+        cache.get("a")
+        cache.put("c", HISTOGRAM)
+        assert cache.get("b") is None
+        assert cache.get("a") and cache.get("c")
+        assert cache.stats["evictions"] == 1
+        assert cache.stats["bytes"] == size * 2
+
+
+def test_04():  # Swatcher reuses cached histograms
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = HistogramCache(temp_dir)
+        first = Swatcher(create_test_image_bytes(), cache=cache)
+        second = Swatcher(create_test_image_bytes(), cache=cache)
+        third = Swatcher(create_test_image_bytes((0, 255, 0)), cache=cache)
+        assert second._colors == first._colors
+        assert second.palette == first.palette
+        assert third.palette != first.palette
+        assert cache.stats["hits"] == 1
+        assert cache.stats["misses"] == 2
+        assert second.processed_image.size == first.processed_image.size
+
+
+def test_05():  # cache keys hash the whole file after processed_image moved it
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = HistogramCache(temp_dir)
+        palettes = []
+        for fill in ((255, 0, 0), (0, 0, 255)):
+            temp = BytesIO()
+            Image.new("RGB", (60, 40), fill).save(temp, "PNG")
+            temp.seek(0)
+            s = Swatcher(temp, cache=cache)
+            s.processed_image
+            palettes.append(s.palette)
+        assert palettes == [[(255, 0, 0)], [(0, 0, 255)]]
+        assert cache.stats["hits"] == 0
+        assert cache.stats["misses"] == 2
+
+
+def test_06():  # files are hashed in chunks, same key as their bytes
+    data = os.urandom(HASH_CHUNK_SIZE * 2 + 10)
+    file = BytesIO(data)
+    file.seek(5)
+    key = HistogramCache.key(data, max_size=500)
+    assert HistogramCache.key(file, max_size=500) == key
+    assert file.tell() == 5
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fp = os.path.join(temp_dir, "image.bin")
+        with open(fp, "wb") as f:
+            f.write(data)
+        assert HistogramCache.key(fp, max_size=500) == key
+
+
+def test_07(monkeypatch):  # entries removed by another process are misses
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = HistogramCache(temp_dir)
+        cache.put("key", HISTOGRAM)
+        utime = os.utime
+
+        def evicted(fp, *args, **kwargs):
+            os.remove(fp)
+            return utime(fp, *args, **kwargs)
+
+        # another process evicts the entry between reading and touching it
+        monkeypatch.setattr(os, "utime", evicted)
+        assert cache.get("key") == HISTOGRAM
+        monkeypatch.undo()
+        assert cache.get("key") is None
+        cache.evict()
+        assert cache.stats["bytes"] == 0
+
+
+def test_08():  # failed writes don't leave temporary files behind
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = HistogramCache(temp_dir)
+
+        class Broken:
+            def to_bytes(self):
+                return None
+
+        with pytest.raises(TypeError):
+            cache.put("key", Broken())
+        assert os.listdir(temp_dir) == []
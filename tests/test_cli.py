@@ -0,0 +1,150 @@
+import os
+import pytest
+import tempfile
+
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image, ImageDraw
+from swatcher import cli, export
+
+
+def create_test_images(directory: str) -> list:
+    paths = []
+    for i, fill in enumerate(((255, 0, 0), (0, 0, 255))):
+        img = Image.new("RGB", (300, 200), (255, 255, 255))
+        d = ImageDraw.Draw(img)
+        d.rectangle((0, 0, 100, 200), fill)
+        path = os.path.join(directory, f"image_{i}.png")
+        img.save(path)
+        paths.append(path)
+    return paths
+
+
+def test_01():  # find files from directories and glob patterns
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = create_test_images(temp_dir)
+        open(os.path.join(temp_dir, "notes.txt"), "w").close()
+        assert cli.find_files([temp_dir]) == paths
+        assert cli.find_files([os.path.join(temp_dir, "*_1.png")]) == paths[1:]
+
+
+def test_02():  # batch export on a process pool
+    with tempfile.TemporaryDirectory() as temp_dir:
+        create_test_images(temp_dir)
+        output = os.path.join(temp_dir, "exports")
+        os.mkdir(output)
+        code = cli.main([temp_dir, "-o", output, "-w", "2", "--chunk-size", "1", "-q"])
+        assert code == 0
+        assert sorted(os.listdir(output)) == [
+            "image_0.png.SWATCHER.ase",
+            "image_0.png.SWATCHER.png",
+            "image_1.png.SWATCHER.ase",
+            "image_1.png.SWATCHER.png",
+        ]
+
+
+def test_03():  # per-file error report
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = create_test_images(temp_dir)
+        broken = os.path.join(temp_dir, "broken.png")
+        with open(broken, "wb") as file:
+            file.write(b"not an image")
+        results = cli.process_files(
+            paths + [broken], {**OPTIONS, "output": temp_dir}, workers=1
+        )
+        errors = {path: error for path, _, error in results if error}
+        assert list(errors) == [broken]
+        assert cli.main([temp_dir, "-q", "--no-image"]) == 1
+
+
+OPTIONS = {
+    "max_colors": 8,
+    "sensitivity": 75,
+    "quantize": None,
+    "draft": False,
+    "output": None,
+    "ase": True,
+    "image": False,
+}
+
+
+def test_04():  # same-named images in different directories keep their paths
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for directory, fill in (("a", (255, 0, 0)), ("b", (0, 0, 255))):
+            os.mkdir(os.path.join(temp_dir, directory))
+            Image.new("RGB", (30, 20), fill).save(
+                os.path.join(temp_dir, directory, "x.png")
+            )
+        output = os.path.join(temp_dir, "exports")
+        os.mkdir(output)
+        code = cli.main([temp_dir, "-r", "-o", output, "-w", "1", "-q", "--no-image"])
+        assert code == 0
+        exported = [os.path.join(output, d, "x.png.SWATCHER.ase") for d in "ab"]
+        assert all(os.path.exists(fp) for fp in exported)
+        assert [export.read_ase_palettes(fp) for fp in exported] == [
+            [(None, [(255, 0, 0)])],
+            [(None, [(0, 0, 255)])],
+        ]
+
+
+def test_05():  # output name collisions are reported instead of overwritten
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = []
+        for directory in ("a", "b"):
+            os.mkdir(os.path.join(temp_dir, directory))
+            paths.append(os.path.join(temp_dir, directory, "x.png"))
+            Image.new("RGB", (30, 20), (255, 0, 0)).save(paths[-1])
+        output = os.path.join(temp_dir, "exports")
+        os.mkdir(output)
+        results = cli.process_files(paths, {**OPTIONS, "output": output}, workers=1)
+        assert sorted(path for path, _, error in results if error) == paths
+        assert os.listdir(output) == []
+        assert cli.main(paths + ["-o", output, "-q", "--no-image"]) == 1
+
+
+def test_06(monkeypatch):  # a dead worker fails its chunks, not the whole run
+    pools = []
+
+    class Executor:
+        def __init__(self, max_workers):
+            self.broken = not pools  # only the first pool dies
+            pools.append(self)
+
+        def submit(self, func, *args):
+            future = Future()
+            if self.broken:
+                future.set_exception(BrokenProcessPool("worker died"))
+            else:
+                future.set_result(func(*args))
+            return future
+
+        def shutdown(self, wait=True):
+            pass
+
+    monkeypatch.setattr(cli, "ProcessPoolExecutor", Executor)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = []
+        for name in ("a", "b"):
+            os.mkdir(os.path.join(temp_dir, name))
+            paths.extend(create_test_images(os.path.join(temp_dir, name)))
+        # one worker keeps two chunks in flight, both die with the pool
+        results = cli.process_files(paths, OPTIONS, workers=1, chunk_size=1)
+        errors = {path: error for path, _, error in results if error}
+        assert sorted(errors) == paths[:2]
+        assert errors[paths[0]].startswith("BrokenProcessPool")
+        assert len(results) == 4
+        assert len(pools) == 2
+
+
+@pytest.mark.parametrize("option", ["--workers", "--chunk-size"])
+def test_07(option, capsys):  # workers and chunk size must be at least 1
+    assert (
+        cli.parse_args(["image.png", option, "3"]).__dict__[
+            option.strip("-").replace("-", "_")
+        ]
+        == 3
+    )
+    for value in ("0", "-1", "two"):
+        with pytest.raises(SystemExit):
+            cli.parse_args(["image.png", option, value])
+        assert "must be at least 1" in capsys.readouterr().err
@@ -0,0 +1,64 @@
+import pytest
+
+from PIL import Image
+from swatcher import cluster, color
+
+
+COLORS = [(250, 0, 0), (255, 0, 0), (0, 0, 250), (0, 0, 255), (255, 255, 255)]
+COUNTS = [30, 10, 20, 20, 20]
+
+
+def test_01():  # median cut splits at the weighted median
+    colors = [(0, 0, 0), (10, 0, 0), (200, 0, 0), (210, 0, 0)]
+    report = cluster.median_cut(colors, 2, [1, 3, 3, 1])
+    assert report.palette == [(8, 0, 0), (202, 0, 0)]
+    assert report.weights == [0.5, 0.5]
+    assert report.iterations == 1
+
+
+def test_02():  # k-means clusters the weighted histogram
+    pytest.importorskip("numpy")
+    report = cluster.kmeans(COLORS, 3, COUNTS)
+    assert sorted(report.palette) == [(0, 0, 252), (251, 0, 0), (255, 255, 255)]
+    assert sorted(report.weights) == [0.2, 0.4, 0.4]
+
+
+def test_03():  # same seed gives the same palette
+    pytest.importorskip("numpy")
+    noise = Image.effect_noise((100, 100), 90)
+    img = Image.merge("RGB", (noise, noise.rotate(90), noise.rotate(180)))
+    histogram = color.get_histogram(img)
+    first = cluster.kmeans(histogram, 6, seed=3, batch_size=256)
+    assert first == cluster.kmeans(histogram, 6, seed=3, batch_size=256)
+    assert first.iterations <= 100
+    assert round(sum(first.weights), 6) == 1
+
+
+def test_04():  # iteration and time budgets
+    pytest.importorskip("numpy")
+    histogram = color.get_histogram(Image.effect_noise((100, 100), 90))
+    assert cluster.kmeans(histogram, 4, max_iter=2, tol=0).iterations == 2
+    assert cluster.kmeans(histogram, 4, time_budget=0).iterations == 0
+
+
+def test_05():  # fewer distinct colors than max colors
+    report = cluster.cluster([(0, 0, 0), (255, 255, 255)], 8, "median-cut")
+    assert sorted(report.palette) == [(0, 0, 0), (255, 255, 255)]
+    pytest.importorskip("numpy")
+    assert len(cluster.kmeans([(0, 0, 0), (255, 255, 255)], 8).palette) == 2
+
+
+def test_06(monkeypatch):  # bad input
+    with pytest.raises(ValueError):
+        cluster.cluster(COLORS, 3, "dbscan")
+    monkeypatch.setattr(cluster, "np", None)
+    with pytest.raises(ImportError):
+        cluster.kmeans(COLORS, 3, COUNTS)
+
+
+def test_07(monkeypatch):  # pure python median cut matches numpy
+    expected = cluster.median_cut(COLORS, 3, COUNTS)
+    monkeypatch.setattr(cluster, "np", None)
+    assert cluster.median_cut(COLORS, 3, COUNTS) == expected
+    histogram = color.get_histogram(Image.new("RGB", (4, 4), (200, 10, 10)))
+    assert cluster.median_cut(histogram).palette == [(200, 10, 10)]
@@ -1,5 +1,16 @@
+import pytest
+
+from PIL import Image, ImageDraw
 from swatcher import color
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# histogram engines that can run here, NumPy is an optional extra
+ENGINES = [e for e in color.HISTOGRAM_ENGINES if numpy is not None or e != "numpy"]
+
 
 def test_01():  # normalize_rgb_values function
     assert color.normalize_rgb_values((1, 1, 1)) == (0, 0, 0)
@@ -56,3 +67,92 @@ def test_11():  # color distance calcuation
 
 def test_12():  # color distance calcuation
     assert color.color_distance((0, 0, 0), (0, 0, 0)) == 0
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_13(engine):  # numpy and python histogram engines match
+    img = Image.new("RGB", (4, 4), (255, 255, 255))
+    d = ImageDraw.Draw(img)
+    d.point(((0, 0), (3, 3)), (0, 0, 255))
+    d.point(((1, 0), (2, 2)), (255, 0, 0))
+    d.point((2, 0), (0, 255, 0))
+    assert color.get_color_counts(img, engine) == color.get_color_counts(img, "python")
+
+
+def test_14():  # color counts ordered by most common
+    img = Image.new("RGB", (3, 1), (255, 255, 255))
+    img.putpixel((1, 0), (0, 0, 0))
+    assert color.get_color_counts(img) == ([(255, 255, 255), (0, 0, 0)], [2, 1])
+
+
+def test_15():  # unknown histogram engine
+    with pytest.raises(ValueError):
+        color.get_color_counts(Image.new("RGB", (1, 1)), "cython")
+    with pytest.raises(ValueError):
+        color.count_strips([Image.new("RGB", (1, 1))], "cython")
+    assert color.histogram_engine() == ENGINES[0]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_16(engine):  # counting strips matches counting the whole image
+    img = Image.effect_noise((30, 20), 90).convert("RGB").quantize(16).convert("RGB")
+    strips = [img.crop((0, y, 30, min(y + 3, 20))) for y in range(0, 20, 3)]
+    assert color.count_strips(strips, engine) == color.get_histogram(img, engine)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_17(engine):  # near black and white variants merged before counting
+    img = Image.new("RGB", (4, 1), (0, 0, 0))
+    img.putpixel((1, 0), (2, 1, 3))
+    img.putpixel((2, 0), (254, 253, 255))
+    img.putpixel((3, 0), (2, 100, 254))
+    assert color.get_color_counts(img) == (
+        [(0, 0, 0), (255, 255, 255), (0, 100, 255)],
+        [2, 1, 1],
+    )
+    assert len(color.get_colors(img, normalize=False)) == 4
+    assert color.get_colors(img, engine) == color.get_colors(img, "python")
+
+
+def test_18():  # rgb to CIELAB
+    assert [round(v, 2) for v in color.rgb_2_lab((255, 255, 255))] == [100, 0, 0]
+    assert [round(v, 2) for v in color.rgb_2_lab((255, 0, 0))] == [53.24, 80.09, 67.2]
+    assert color.rgb_2_lab((0, 0, 0)) == (0, 0, 0)
+
+
+def test_19():  # CIEDE2000 reference color differences
+    pairs = [
+        ((50, 2.6772, -79.7751), (50, 0, -82.7485), 2.0425),
+        ((50, 2.5, 0), (73, 25, -18), 27.1492),
+        ((50, 2.49, -0.001), (50, -2.49, 0.0011), 7.2195),
+        ((60.2574, -34.0099, 36.2677), (60.4626, -34.1751, 39.4387), 1.2644),
+    ]
+    for lab1, lab2, expected in pairs:
+        assert round(color.delta_e_ciede2000(lab1, lab2), 4) == expected
+    assert color.delta_e_cie76((50, 0, 0), (53, 4, 0)) == 5
+
+
+def test_20():  # hex and cmyk conversions are cached
+    color.clear_caches()
+    assert color.rgb_2_hex([255, 0, 10]) == "#ff000a"
+    assert color.rgb_2_hex((255, 0, 10)) == "#ff000a"
+    assert color.rgb_2_cmyk([0, 0, 0]) == (0, 0, 0, 100)
+    stats = color.cache_stats()
+    assert stats["hex"]["hits"] == 1
+    assert stats["hex"]["misses"] == 1
+    assert stats["cmyk"]["size"] == 1
+
+
+def test_21():  # resizing the caches
+    color.set_cache_size(2)
+    try:
+        for value in range(4):
+            color.rgb_2_hex((value, 0, 0))
+        assert color.cache_stats()["hex"] == {
+            "hits": 0,
+            "misses": 4,
+            "maxsize": 2,
+            "size": 2,
+        }
+    finally:
+        color.set_cache_size(color.COLOR_CACHE_SIZE)
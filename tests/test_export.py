@@ -0,0 +1,152 @@
+import os
+import pytest
+import struct
+import tempfile
+
+from io import BytesIO
+from swatcher import export
+
+
+COLORS = [(255, 203, 156), (218, 227, 226), (81, 63, 59), (0, 0, 0)]
+
+
+def test_01():  # direct encoder matches the swatch dictionary encoder
+    expected = export.colors_to_bytes(export.create_ase_swatches(COLORS))
+    assert export.encode_ase(COLORS) == expected
+    assert export.encode_ase([]) == export.colors_to_bytes([])
+
+
+def test_02():  # fixed size header and color blocks
+    data = export.encode_ase(COLORS)
+    assert len(data) == 12 + 42 * len(COLORS)
+    assert data[:12] == b"ASEF\x00\x01\x00\x00\x00\x00\x00\x04"
+
+
+def test_03():  # write straight to any binary stream
+    stream = BytesIO()
+    assert export.write_ase(COLORS, stream) == 12 + 42 * len(COLORS)
+    assert stream.getvalue() == export.encode_ase(COLORS)
+    assert export.write_ase_file(COLORS).read() == stream.getvalue()
+
+
+def test_04():  # export to the filesystem
+    with tempfile.TemporaryDirectory() as temp:
+        fp = export.export_ase_file(COLORS, os.path.join(temp, "colors"))
+        assert fp.endswith("colors.SWATCHER.ase")
+        with open(fp, "rb") as file:
+            assert file.read() == export.encode_ase(COLORS)
+        with pytest.raises(OSError):
+            export.export_ase_file(COLORS, os.path.join(temp, "missing", "colors"))
+
+
+def test_05():  # color groups wrap each palette
+    stream = BytesIO()
+    with export.ASEWriter(stream) as writer:
+        writer.write_palette(COLORS[:2], "a.jpg")
+        writer.write_palette(COLORS[2:], "b.jpg")
+    data = stream.getvalue()
+    assert data[8:12] == (8).to_bytes(4, "big")
+    group = export.group_start_chunk("a.jpg")
+    assert group == b"\xc0\x01\x00\x00\x00\x0e\x00\x06" + "a.jpg\0".encode("utf-16be")
+    body = export.encode_ase(COLORS[:2])[12:]
+    assert data[12:].startswith(group + body + b"\xc0\x02\x00\x00\x00\x00")
+    assert len(data) == 12 + 2 * (len(group) + 6) + 42 * len(COLORS)
+
+
+def test_06():  # non-seekable streams need the block count up front
+    class Socket:
+        def __init__(self):
+            self.data = b""
+
+        def write(self, data):
+            self.data += bytes(data)
+
+    with pytest.raises(ValueError):
+        export.ASEWriter(Socket())
+    socket = Socket()
+    with export.ASEWriter(socket, blocks=len(COLORS)) as writer:
+        writer.write_palette(COLORS)
+    assert socket.data == export.encode_ase(COLORS)
+    writer = export.ASEWriter(Socket(), blocks=10)
+    writer.write_palette(COLORS, "a.jpg")
+    with pytest.raises(ValueError):
+        writer.close()
+
+
+def test_07():  # export many palettes to a single file
+    palettes = ((f"image {i}.jpg", COLORS) for i in range(3))
+    with tempfile.TemporaryDirectory() as temp:
+        fp = export.export_ase_groups(palettes, os.path.join(temp, "catalog"))
+        with open(fp, "rb") as file:
+            data = file.read()
+    assert data[8:12] == (3 * (len(COLORS) + 2)).to_bytes(4, "big")
+    assert data.count(b"\xc0\x01") == 3
+
+
+def test_08():  # encoded color blocks are cached
+    export.clear_caches()
+    export.encode_ase(COLORS * 3)
+    stats = export.cache_stats()["swatch"]
+    assert stats["misses"] == len(COLORS)
+    assert stats["hits"] == 2 * len(COLORS)
+    export.colors_to_bytes(export.create_ase_swatches(COLORS * 2))
+    assert export.cache_stats()["chunk"]["hits"] == len(COLORS)
+    export.set_cache_size(2)
+    try:
+        assert export.encode_ase(COLORS) == export.colors_to_bytes(
+            export.create_ase_swatches(COLORS)
+        )
+        # palettes larger than the cache bypass it
+        assert export.cache_stats()["swatch"]["size"] == 0
+        export.encode_ase(COLORS[:2])
+        assert export.cache_stats()["swatch"]["size"] == 2
+    finally:
+        export.set_cache_size(export.SWATCH_CACHE_SIZE)
+
+
+def test_09():  # read swatches back from an encoded file
+    swatches = list(export.iter_ase(export.encode_ase(COLORS)))
+    assert [swatch.name for swatch in swatches] == [
+        "#ffcb9c",
+        "#dae3e2",
+        "#513f3b",
+        "#000000",
+    ]
+    assert swatches[-1] == ("#000000", "RGB", (0.0, 0.0, 0.0), "Process", None)
+
+
+def test_10():  # grouped files round trip exactly
+    palettes = [("a.jpg", COLORS), ("b.jpg", COLORS[::-1]), (None, [(1, 2, 3)])]
+    with tempfile.TemporaryDirectory() as temp:
+        fp = export.export_ase_groups(palettes, os.path.join(temp, "catalog"))
+        assert export.read_ase_palettes(fp) == palettes
+        copy = export.export_ase_groups(
+            export.read_ase_palettes(fp), os.path.join(temp, "copy")
+        )
+        with open(fp, "rb") as original, open(copy, "rb") as file:
+            assert file.read() == original.read()
+        with open(fp, "rb") as file:
+            groups = [swatch.group for swatch in export.read_ase(file)]
+    assert groups == ["a.jpg"] * 4 + ["b.jpg"] * 4 + [None]
+    stream = BytesIO(export.encode_ase(COLORS))
+    assert export.read_ase_palettes(stream) == [(None, COLORS)]
+
+
+def test_11():  # other color modes
+    name = "Cyan\0".encode("utf-16be")
+    body = struct.pack(">H", 5) + name + b"CMYK" + struct.pack(">4fh", 1, 0, 0, 0, 1)
+    cmyk = struct.pack(">HI", 1, len(body)) + body
+    data = export.ASE_HEADER.pack(b"ASEF", 1, 0, 1) + cmyk
+    (swatch,) = export.iter_ase(data)
+    assert swatch == ("Cyan", "CMYK", (1.0, 0.0, 0.0, 0.0), "Spot", None)
+    assert export.read_ase_palettes(BytesIO(data)) == []
+
+
+def test_12():  # invalid files
+    with pytest.raises(ValueError):
+        list(export.iter_ase(b"PNG\x00"))
+    with pytest.raises(ValueError):
+        list(export.iter_ase(export.encode_ase(COLORS)[:-1]))
+    bad_mode = export.encode_ase(COLORS).replace(b"RGB ", b"HSV ")
+    with pytest.raises(ValueError):
+        list(export.iter_ase(bad_mode))
@@ -0,0 +1,76 @@
+import pytest
+
+from array import array
+from PIL import Image
+from swatcher import color
+from swatcher.histogram import ColorHistogram, open_histogram, pack_rgb, unpack_rgb
+
+
+COLORS = [(255, 0, 0), (0, 0, 255), (255, 255, 255)]
+COUNTS = [400, 300, 100]
+HISTOGRAM = ColorHistogram.from_colors(COLORS, COUNTS)
+
+
+def test_01():  # packing rgb values
+    assert pack_rgb((250, 112, 20)) == 0xFA7014
+    assert unpack_rgb(0xFA7014) == (250, 112, 20)
+
+
+def test_02():  # iterating yields rgb tuples
+    assert list(HISTOGRAM) == COLORS
+    assert HISTOGRAM == COLORS
+    assert HISTOGRAM[1] == (0, 0, 255)
+    assert len(HISTOGRAM) == 3
+
+
+def test_03():  # slicing keeps the counts
+    assert HISTOGRAM[:2] == ColorHistogram.from_colors(COLORS[:2], COUNTS[:2])
+
+
+def test_04():  # binary round trip
+    assert ColorHistogram.from_bytes(HISTOGRAM.to_bytes()) == HISTOGRAM
+
+
+def test_05():  # not a packed histogram
+    with pytest.raises(ValueError):
+        ColorHistogram.from_bytes(b"not a histogram")
+
+
+def test_06():  # mismatched counts
+    with pytest.raises(ValueError):
+        ColorHistogram(array("I", [0, 1]), array("I", [1]))
+
+
+def test_07():  # packed memory is a fraction of a list of tuples
+    img = Image.effect_noise((200, 200), 100).convert("RGB")
+    histogram = color.get_histogram(img)
+    assert histogram.nbytes == len(histogram) * 8
+
+
+def test_08():  # normalized flag survives slicing and the binary format
+    img = Image.new("RGB", (2, 1), (2, 2, 2))
+    histogram = color.get_histogram(img)
+    assert histogram.normalized
+    assert histogram[:1].normalized
+    assert ColorHistogram.from_bytes(histogram.to_bytes()).normalized
+    assert not ColorHistogram.from_bytes(HISTOGRAM.to_bytes()).normalized
+
+
+def test_09(tmp_path):  # saved histograms are memory-mapped without copying
+    fp = str(tmp_path / "colors.swch")
+    HISTOGRAM.save(fp)
+    mapped = open_histogram(fp)
+    assert isinstance(mapped.colors, memoryview)
+    assert mapped == HISTOGRAM
+    assert mapped[1:].tolist() == COLORS[1:]
+    assert mapped.to_bytes() == HISTOGRAM.to_bytes()
+    assert ColorHistogram.from_buffer(HISTOGRAM.to_bytes()) == HISTOGRAM
+
+
+def test_10(tmp_path):  # bad histogram files
+    fp = tmp_path / "empty.swch"
+    fp.write_bytes(b"")
+    with pytest.raises(ValueError):
+        open_histogram(str(fp))
+    with pytest.raises(ValueError):
+        ColorHistogram.from_buffer(HISTOGRAM.to_bytes()[:-4])
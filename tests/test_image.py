@@ -1,7 +1,8 @@
 import pytest
 
-from PIL import Image, ImageDraw, ImageFilter
-from swatcher import image
+from io import BytesIO
+from PIL import Image, ImageChops, ImageDraw, ImageFilter
+from swatcher import color, image
 
 
 def test_01():  # one centered pixel
@@ -75,3 +76,146 @@ def test_08():  # small image
     img = Image.new(size=(50, 50), mode="RGBA")
     img = image.process_image(img)
     assert img.size == (50, 50)
+
+
+def test_09():  # bit depth reduction bounds the number of colors
+    img = Image.linear_gradient("L").convert("RGB")
+    img = image.process_image(img, quantize=2)
+    assert sorted(c for _, c in img.getcolors()) == [
+        (0, 0, 0),
+        (85, 85, 85),
+        (170, 170, 170),
+        (255, 255, 255),
+    ]
+
+
+def test_10():  # quantize methods bound the number of colors
+    img = Image.merge("RGB", [Image.effect_noise((100, 100), 100)] * 3)
+    for method in image.QUANTIZE_METHODS:
+        quantized = image.process_image(img, quantize=method)
+        assert len(quantized.getcolors(4096)) <= 256
+
+
+def test_11():  # unknown quantize method
+    with pytest.raises(ValueError):
+        image.process_image(Image.new("RGB", (10, 10)), quantize="k-means")
+
+
+def test_12():  # jpeg decoded in draft mode close to the processing size
+    img = Image.new("RGB", (4000, 3000), (255, 255, 255))
+    d = ImageDraw.Draw(img)
+    d.rectangle((0, 0, 2000, 3000), (255, 0, 0))
+    temp = BytesIO()
+    img.save(temp, "JPEG")
+    img = Image.open(temp)
+    processed = image.process_image(img, draft=True)
+    assert processed.size == (500, 375)
+    # the caller's image is left at full resolution
+    assert img.size == (4000, 3000)
+    assert img.load() and img.getpixel((3999, 0)) == (255, 255, 255)
+
+
+def test_13():  # large non-jpeg reduced without blending colors
+    img = Image.new("RGB", (2000, 2000), (255, 0, 0))
+    d = ImageDraw.Draw(img)
+    d.rectangle((1000, 0, 2000, 2000), (0, 0, 255))
+    reduced = image.draft_image(img)
+    assert reduced.size == (500, 500)
+    assert sorted(c for _, c in reduced.getcolors()) == [(0, 0, 255), (255, 0, 0)]
+
+
+def allocated_images(img: object) -> int:
+    """Count the PIL images allocated while processing `img`."""
+    before = Image.core.get_stats()["new_count"]
+    image.process_image(img)
+    return Image.core.get_stats()["new_count"] - before
+
+
+def test_14():  # opaque images skip alpha compositing
+    opaque = Image.new("RGB", (600, 400), (255, 0, 0))
+    transparent = opaque.convert("RGBA")
+    transparent.putpixel((300, 200), (0, 0, 0, 0))
+    assert image.has_transparency(transparent)
+    assert not image.has_transparency(opaque.convert("RGBA"))
+    # RGBA conversion, white background and composite are skipped
+    assert allocated_images(transparent) - allocated_images(opaque) >= 3
+
+
+def test_15():  # opaque alpha band gives the same result as compositing
+    img = Image.new("RGBA", (100, 100), (255, 128, 0, 255))
+    d = ImageDraw.Draw(img)
+    d.ellipse((20, 20, 80, 80), (0, 128, 255, 255))
+    bg = Image.new("RGBA", img.size, (255, 255, 255))
+    composite = Image.alpha_composite(bg, img).convert("RGB")
+    composite = image.trim_excess(composite)
+    assert image.process_image(img).tobytes() == composite.tobytes()
+
+
+def framed_image() -> object:
+    """Noisy transparent image on a plain background."""
+    noise = Image.effect_noise((90, 60), 80).convert("RGB").quantize(24)
+    img = Image.new("RGBA", (120, 100), (255, 255, 255, 255))
+    img.paste(noise.convert("RGBA"), (13, 21))
+    img.putpixel((60, 3), (0, 0, 0, 0))
+    return img
+
+
+def test_16():  # streamed processing matches process_image
+    img = framed_image()
+    for max_size in (500, 50, None):
+        expected = image.process_image(img, max_size=max_size)
+        for strip_height in (1, 7, 256):
+            streamed = image.stream_image(img, max_size, strip_height=strip_height)
+            assert streamed.size == expected.size
+            assert streamed.tobytes() == expected.tobytes()
+
+
+def test_17():  # streamed full resolution histogram matches
+    img = framed_image()
+    expected = color.get_histogram(image.process_image(img, max_size=None))
+    for strip_height in (1, 9, 256):
+        assert image.stream_histogram(img, strip_height=strip_height) == expected
+    with pytest.raises(ValueError):
+        image.stream_histogram(img, quantize="octree")
+
+
+def test_18():  # thumbnail size matches Image.thumbnail
+    for size in ((1000, 3), (3, 1000), (777, 555), (1234, 4321), (501, 500)):
+        img = Image.new("L", size)
+        img.thumbnail((500, 500), resample=0)
+        assert image.thumbnail_size(size, 500) == img.size
+
+
+def test_19():  # streamed all background image isn't trimmed
+    img = Image.new("RGB", (40, 30), (0, 0, 0))
+    assert image.stream_bbox(img, strip_height=4) == (0, 0, 40, 30)
+
+
+def difference_bbox(img: object, bg_pixel: tuple) -> tuple:
+    """Bounding box of non background pixels using a full size difference."""
+    return ImageChops.difference(img, Image.new("RGB", img.size, bg_pixel)).getbbox()
+
+
+def test_20():  # edge scan matches a full size difference
+    for box in ((0, 0, 1, 1), (37, 5, 38, 300), (3, 290, 399, 299), (0, 0, 400, 300)):
+        img = Image.new("RGB", (400, 300), (255, 255, 255))
+        ImageDraw.Draw(img).rectangle(box, (0, 0, 0))
+        img.putpixel((200, 150), (254, 255, 255))
+        expected = difference_bbox(img, (255, 255, 255))
+        assert image.content_bbox(img, (255, 255, 255)) == expected
+    assert image.content_bbox(Image.new("RGB", (9, 9)), (0, 0, 0)) is None
+
+
+def test_21():  # edge scan within a region
+    img = Image.new("RGB", (300, 300), (0, 0, 0))
+    img.putpixel((10, 10), (255, 0, 0))
+    img.putpixel((150, 120), (255, 0, 0))
+    bbox = image.content_bbox(img, (0, 0, 0), (100, 100, 300, 300))
+    assert bbox == (150, 120, 151, 121)
+
+
+def test_22():  # trimming on a downscaled proxy
+    img = Image.new("RGB", (4000, 3000), (255, 255, 255))
+    ImageDraw.Draw(img).rectangle((1001, 777, 2999, 2000), (255, 0, 0))
+    trimmed = image.trim_excess(img, proxy_size=100)
+    assert trimmed.size == image.trim_excess(img).size == (1999, 1224)
@@ -1,5 +1,6 @@
 import pytest
 
+from PIL import Image, ImageDraw
 from swatcher import palette
 
 
@@ -33,3 +34,23 @@ def test_03():  # image size with 100 px swatcher
 def test_04():  # image size with less colors than cols
     img = palette.draw_swatches(COLORS[:2])
     assert img.size == (400, 200)
+
+
+def test_05():  # fonts are loaded once per face and size
+    font = palette.set_font("Missing Font.ttf", 20)
+    assert palette.set_font("Missing Font.ttf", 20) is font
+    assert palette.cache_stats()["font"]["hits"] >= 1
+
+
+def test_06():  # labels are rendered once and match drawing the text
+    palette._label_mask.cache_clear()
+    img = palette.draw_swatches([(0, 0, 0)] * 4, size=150, fontface="Missing.ttf")
+    assert palette.cache_stats()["label"]["misses"] == 1
+    assert palette.cache_stats()["label"]["hits"] == 3
+
+    expected = Image.new("RGBA", (150, 150), (255, 255, 255, 0))
+    d = ImageDraw.Draw(expected)
+    d.rectangle(xy=((0, 0), (149, 149)), fill=(0, 0, 0))
+    font = palette.set_font("Missing.ttf", 25)
+    d.text(xy=(74, 74), text="#000000", fill="white", anchor="mm", font=font)
+    assert img.crop((0, 0, 150, 150)).tobytes() == expected.tobytes()
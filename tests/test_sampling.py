@@ -1,5 +1,8 @@
+import pytest
+
 from PIL import Image, ImageDraw
 from swatcher import color, palette
+from swatcher.histogram import ColorHistogram
 
 
 def test_01():  # sampled_colors from control image
@@ -91,3 +94,141 @@ def test_09():  # sample function on sample list with reduced max_colors
         (0, 255, 0),
         (0, 0, 255),
     ]
+
+
+def test_10():  # sample_many matches sample for every setting
+    colors = [(r, g, b) for r in range(0, 256, 51) for g in (0, 128) for b in (2, 254)]
+    settings = [(m, s) for m in (1, 3, 8, 20) for s in (0, 25, 75, 150, 250)]
+    palettes = palette.sample_many(colors, settings)
+    assert palettes == [palette.sample(colors, m, s) for m, s in settings]
+
+
+def test_11():  # sample_many with no settings
+    assert palette.sample_many([(0, 0, 0)], []) == []
+
+
+def test_12():  # sensitivity index lookups match sample
+    colors = [(r, g, b) for r in range(0, 256, 51) for g in (0, 128) for b in (2, 254)]
+    index = palette.SensitivityIndex(colors)
+    for m in (1, 3, 8, 20):
+        for s in range(0, 251, 10):
+            assert index.lookup(m, s) == palette.sample(colors, m, s)
+
+
+def test_13():  # bounded sensitivity index falls back when incomplete
+    colors = [(0, 0, 0), (128, 128, 128), (255, 255, 255)]
+    index = palette.SensitivityIndex(colors, max_candidates=2)
+    assert index.lookup(2, 75) == [(0, 0, 0), (128, 128, 128)]
+    assert index.lookup(3, 75) is None
+    assert index.lookup(3, 250) is None
+    assert index.nbytes > 0
+
+
+def test_14(monkeypatch):  # pure-python sample_many matches sample
+    monkeypatch.setattr(palette, "np", None)
+    colors = [(r, g, b) for r in range(0, 256, 51) for g in (0, 128) for b in (2, 254)]
+    settings = [(m, s) for m in (1, 3, 8, 20) for s in (0, 25, 75, 150, 250)]
+    palettes = palette.sample_many(colors, settings)
+    assert palettes == [palette.sample(colors, m, s) for m, s in settings]
+
+
+def test_15():  # grid bucketed sampling matches a brute force reference
+    colors = [
+        (r, g, b)
+        for r in range(0, 256, 17)
+        for g in range(0, 256, 51)
+        for b in range(0, 256, 85)
+    ]
+    for max_colors, sensitivity in ((100, 0), (100, 20), (60, 40), (400, 16)):
+        expected = []
+        for c in colors:
+            if len(expected) == max_colors:
+                break
+            c = color.normalize_rgb_values(c)
+            if not any(color.color_distance(c, f) <= sensitivity for f in expected):
+                expected.append(c)
+        assert palette.sample(colors, max_colors, sensitivity) == expected
+
+
+def test_16():  # candidate budget from max_candidates
+    colors = [(0, 0, 0), (128, 128, 128), (255, 255, 255)]
+    assert palette.sample(colors, max_candidates=2) == [(0, 0, 0), (128, 128, 128)]
+
+
+def test_17():  # candidate budget from pixel coverage
+    colors = [(0, 0, 0), (128, 128, 128), (255, 255, 255)]
+    counts = [6, 3, 1]
+    assert palette.candidate_limit(colors, coverage=0.6, counts=counts) == 1
+    assert palette.candidate_limit(colors, coverage=0.9, counts=counts) == 2
+    assert palette.candidate_limit(colors, coverage=1, counts=counts) == 3
+
+
+def test_18():  # sample report of considered colors
+    colors = [(0, 0, 0), (1, 1, 1), (128, 128, 128), (255, 255, 255)]
+    counts = [5, 2, 2, 1]
+    report = palette.sample_report(colors, max_colors=2, counts=counts)
+    assert report.palette == [(0, 0, 0), (128, 128, 128)]
+    assert report.considered == 3
+    assert report.candidates == report.total == 4
+    assert report.pixels == 0.9
+
+
+def test_19():  # coverage without counts
+    with pytest.raises(ValueError):
+        palette.candidate_limit([(0, 0, 0)], coverage=0.5)
+
+
+def test_20():  # merged near black variants change the most common color
+    img = Image.new("RGB", (7, 1), (255, 0, 0))
+    for x, value in enumerate((0, 1, 2, 3)):
+        img.putpixel((x, 0), (value, value, value))
+    # previously every variant was counted on its own (red first)
+    raw = color.get_colors(img, normalize=False)
+    assert palette.sample(raw, max_colors=1) == [(255, 0, 0)]
+    # now the variants are merged into 4 pure black pixels
+    merged = color.get_colors(img)
+    assert len(merged) == 2
+    assert palette.sample(merged, max_colors=1) == [(0, 0, 0)]
+
+
+def test_21():  # normalized histograms are sampled as-is
+    histogram = ColorHistogram.from_colors([(2, 2, 2), (128, 0, 0)])
+    assert palette.sample(histogram) == [(0, 0, 0), (128, 0, 0)]
+    histogram.normalized = True
+    assert palette.sample(histogram) == [(2, 2, 2), (128, 0, 0)]
+    assert palette.sample_many(histogram, [(8, 75)]) == [[(2, 2, 2), (128, 0, 0)]]
+
+
+def perceptual_histogram() -> object:
+    noise = Image.effect_noise((120, 120), 90)
+    gradient = Image.linear_gradient("L").resize((120, 120))
+    img = Image.merge("RGB", (noise, noise.rotate(90), gradient))
+    return color.get_histogram(img)
+
+
+def test_22():  # perceptual metrics
+    histogram = perceptual_histogram()
+    for metric in ("cie76", "ciede2000"):
+        assert len(palette.sample(histogram, 8, 10, metric=metric)) == 8
+    labs = [
+        color.rgb_2_lab(c) for c in palette.sample(histogram, 8, 10, metric="cie76")
+    ]
+    for i, lab in enumerate(labs):
+        assert all(color.delta_e_cie76(lab, found) >= 11 for found in labs[:i])
+    with pytest.raises(ValueError):
+        palette.sample(histogram, metric="hsv")
+
+
+def test_23(monkeypatch):  # pure-python perceptual sampling matches numpy
+    histogram = perceptual_histogram()
+    settings = [(12, s) for s in (0, 5, 20, 60)]
+    for metric in ("cie76", "ciede2000"):
+        expected = [
+            palette.sample_report(histogram, m, s, metric=metric) for m, s in settings
+        ]
+        monkeypatch.setattr(palette, "np", None)
+        reports = [
+            palette.sample_report(histogram, m, s, metric=metric) for m, s in settings
+        ]
+        monkeypatch.undo()
+        assert reports == expected
@@ -0,0 +1,109 @@
+import os
+import pytest
+import tempfile
+
+from swatcher.histogram import ColorHistogram
+from swatcher.store import FileStore, MemoryStore
+
+
+HISTOGRAM = ColorHistogram.from_colors(
+    [(255, 0, 0), (0, 0, 255), (255, 255, 255)], [400, 300, 100]
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def test_01():  # memory store lookups
+    store = MemoryStore()
+    store.put("a1", HISTOGRAM)
+    assert store.get("a1") is HISTOGRAM
+    assert store.get("b2") is None
+    store.delete("a1")
+    assert store.get("a1") is None
+    assert store.stats["hits"] == 1
+    assert store.stats["misses"] == 2
+
+
+def test_02():  # memory store evicts the least recently used entries
+    store = MemoryStore(max_entries=2)
+    store.put("a", HISTOGRAM)
+    store.put("b", HISTOGRAM)
+    store.get("a")
+    store.put("c", HISTOGRAM)
+    assert store.get("b") is None
+    assert store.get("a") is HISTOGRAM
+    assert store.stats["evictions"] == 1
+    assert store.stats["entries"] == 2
+    assert store.stats["bytes"] == 2 * HISTOGRAM.nbytes
+
+
+def test_03():  # memory store entries expire after ttl seconds unused
+    clock = Clock()
+    store = MemoryStore(ttl=10, clock=clock)
+    store.put("a", HISTOGRAM)
+    clock.now = 8
+    assert store.get("a") is HISTOGRAM
+    clock.now = 16
+    assert store.get("a") is HISTOGRAM
+    clock.now = 27
+    assert store.get("a") is None
+    assert store.stats["expirations"] == 1
+
+
+def test_04():  # file store round trip
+    with tempfile.TemporaryDirectory() as temp:
+        store = FileStore(temp)
+        store.put("a1b2", HISTOGRAM)
+        assert store.get("a1b2") == HISTOGRAM
+        # another process sees the same histograms
+        assert FileStore(temp).get("a1b2") == HISTOGRAM
+        store.delete("a1b2")
+        assert store.get("a1b2") is None
+        assert store.stats["bytes"] == 0
+
+
+def test_05():  # file store entries expire after ttl seconds unused
+    with tempfile.TemporaryDirectory() as temp:
+        store = FileStore(temp, ttl=60)
+        store.put("old", HISTOGRAM)
+        store.put("new", HISTOGRAM)
+        os.utime(os.path.join(temp, "old.swch"), (0, 0))
+        assert store.get("old") is None
+        store.put("old", HISTOGRAM)
+        os.utime(os.path.join(temp, "old.swch"), (0, 0))
+        store.expire()
+        assert store.stats["entries"] == 1
+        assert store.stats["expirations"] == 2
+        assert store.get("new") == HISTOGRAM
+
+
+def test_06():  # file store keys can't escape the directory
+    with tempfile.TemporaryDirectory() as temp:
+        store = FileStore(temp)
+        with pytest.raises(ValueError):
+            store.put("../escape", HISTOGRAM)
+        with pytest.raises(ValueError):
+            store.get("")
+
+
+def test_07(monkeypatch):  # entries removed by another process are misses
+    with tempfile.TemporaryDirectory() as temp:
+        store = FileStore(temp)
+        store.put("upload", HISTOGRAM)
+        utime = os.utime
+
+        def evicted(fp, *args, **kwargs):
+            os.remove(fp)
+            return utime(fp, *args, **kwargs)
+
+        monkeypatch.setattr(os, "utime", evicted)
+        assert store.get("upload") == HISTOGRAM
+        monkeypatch.undo()
+        assert store.get("upload") is None
+        assert store.stats["misses"] == 1